@@ -0,0 +1,300 @@
+import asyncio
+from itertools import islice
+
+import aiomysql
+
+from MySQL_Class import MSQL
+
+
+class AsyncMSQL:
+    '''
+        An asyncio version of MSQL, with the same methods as coroutines.
+        The queries run over a pool of aiomysql connections, so many coroutines
+        can wait on the database at the same time without blocking the event loop.
+
+        Attributes
+        ----------
+        host_ip: str
+            Hostname of the mysql server you'll communicate with.
+        username: str
+            Username you will execute your queries with.
+        password: str
+            Password (for the username) you will execute your queries with.
+        database_name: str(optional)
+            A database to query.
+        port: int(optional)
+            Port of the mysql server.
+        pool_min: int(optional)
+            Connections opened upon connecting.
+        pool_max: int(optional)
+            Maximum connections open at the same time.
+        pool: aiomysql.Pool
+            The pool the coroutines borrow connections from (None until connected).
+
+        Methods
+        -------
+        connect():
+            Creates the pool (done on first use if not called).
+        close():
+            Closes the pool's connections.
+        reconnect():
+            Closes the pool and creates it again.
+        show_dbs(), show_tables(), show_columns(table_name),
+        create_db(db_name), create_table(table_name, columns),
+        insert_record(table_name, columns, values), insert_records(table_name, columns, rows, chunk_size),
+        delete_record(table_name, record_id), find_record(table_name, record_id),
+        find_records(table_name, column, value), find_all_records(table_name),
+        update_record(table_name, columns, values, record_id):
+            Same as MSQL's, awaited.
+
+        Example of use
+        --------------
+        db = AsyncMSQL('localhost', 'root', '123456', 'test_db', pool_max=50)
+        records = await asyncio.gather(*(db.find_record('test_table', i) for i in range(1, 500)))
+        await db.close()
+    '''
+    def __init__(self, host_ip: str, username: str, password: str, database_name: str=None,
+                 port: int=3306, pool_min: int=1, pool_max: int=10):
+        self.host_ip, self.username, self.password, self.database_name = host_ip, username, password, database_name
+        self.port, self.pool_min, self.pool_max = port, pool_min, pool_max
+        self.pool = None
+        self.pool_lock = None
+
+    async def connect(self):
+        '''
+            Creates the pool of connections.
+            Called by the other coroutines on first use, so calling it is optional.
+
+            Raises
+            ------
+            If a connection can't be established, an excpetion will be raised.
+        '''
+        if self.pool_lock is None:
+            self.pool_lock = asyncio.Lock()
+        async with self.pool_lock:
+            if self.pool is not None:
+                return
+            # with autocommit a read doesn't leave its connection inside a transaction,
+            # which the pool would close instead of reusing
+            connection_args = {"host": self.host_ip, "port": self.port, "user": self.username,
+                               "password": self.password, "minsize": self.pool_min, "maxsize": self.pool_max,
+                               "autocommit": True}
+            if self.database_name != None:
+                connection_args["db"] = self.database_name
+            try:
+                self.pool = await aiomysql.create_pool(**connection_args)
+            except:
+                raise Exception("ERROR: could not connect to database,\n check internet connectivity and/or credenetials")
+
+    async def close(self):
+        '''
+            Closes the pool's connections.
+        '''
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            pool.close()
+            await pool.wait_closed()
+
+    async def reconnect(self):
+        '''
+            Closes the pool and creates it again (good use case is
+            if midway you need to change details of connection but can't change object)
+        '''
+        await self.close()
+        await self.connect()
+
+    async def _execute(self, sql_line: str, values=None, fetch: str=None):
+        '''
+            Borrows a connection, executes a query (committed on its own, the pool is in autocommit mode)
+            and returns the rows (fetch='all'/'one') or the cursor's lastrowid and rowcount.
+        '''
+        if self.pool is None:
+            await self.connect()
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(sql_line, values)
+                if fetch == 'all':
+                    return await cursor.fetchall()
+                if fetch == 'one':
+                    return await cursor.fetchone()
+                return cursor.lastrowid, cursor.rowcount
+
+    async def show_dbs(self):
+        '''
+            Returns a list of the databases in the server.
+        '''
+        try:
+            rows = await self._execute("SHOW DATABASES", fetch='all')
+        except:
+            return(f"ERROR: Either you disconnected, or there are no Databases")
+        return({"DBs": [db[0] for db in rows]})
+
+    async def show_tables(self):
+        '''
+            Returns a list of tables in your database.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            rows = await self._execute("SHOW TABLES", fetch='all')
+        except:
+            return(f"ERROR: Either you disconnected, or there are no tables in db: {self.database_name}")
+        return({"DB": self.database_name, "Tables": [table[0] for table in rows]})
+
+    async def show_columns(self, table_name: str):
+        '''
+            Returns a dict with the columns and the type of values they expect.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            rows = await self._execute(f"SHOW Columns in {table_name}", fetch='all')
+        except:
+            return(f"ERROR: Either you disconnected, or table: {table_name} doesn't exist")
+        return({"DB": self.database_name, "Table": table_name, "Columns": {column[0]: column[1] for column in rows}})
+
+    async def create_db(self, db_name: str):
+        '''
+            Creates a DB with the name given.
+            Then assigns it to self.database_name and reconnects to it.
+        '''
+        try:
+            await self._execute(f"CREATE DATABASE {db_name}")
+            self.database_name = db_name
+            await self.reconnect()
+            return({'DB': self.database_name})
+        except:
+            return(f"ERROR: Either you disconnected, or a DB named {db_name} already exists")
+
+    async def create_table(self, table_name: str, columns: str):
+        '''
+            Creates a table with the name and columns given,
+            Example of use:
+            await db.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            await self._execute(f"CREATE TABLE {table_name} {columns}")
+            return({"DB": self.database_name, "Table": table_name})
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} already exists, or the columns were given in an incorrect format.\nExample of use:\nawait db.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')")
+
+    async def insert_record(self, table_name: str, columns: tuple, values: tuple):
+        '''
+            Inserts a record to table given, fills the supplied columns with the supplied values.
+            Return its ID.
+            Example of use:
+            await db.insert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem'))
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            sql_line = MSQL.statement('insert', table_name, tuple(columns))
+        except:
+            return("ERROR: couldnt format the columns argument, it should look like so:\ninsert_record(columns=('age', 'name'))\nOR\ninsert_record(columns=('age',))")
+        try:
+            lastrowid, _ = await self._execute(sql_line, values)
+            return({"id": str(lastrowid)})
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\nawait db.insert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem'))")
+
+    async def insert_records(self, table_name: str, columns: tuple, rows, chunk_size: int=1000):
+        '''
+            Inserts many records with multi-row INSERT statements, committing once per chunk.
+            Returns the amount of records inserted, the amount of chunks,
+            and the first/last generated IDs (see MSQL.insert_records).
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if chunk_size < 1:
+            return("ERROR: chunk_size should be a positive integer")
+
+        columns = tuple(columns)
+        rows = iter(rows)
+        inserted, chunks, first_id, last_id = 0, 0, None, None
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                values = []
+                for row in chunk:
+                    if len(row) != len(columns):
+                        raise ValueError(f"row {row} doesn't match the columns {columns}")
+                    values.extend(row)
+
+                lastrowid, _ = await self._execute(MSQL.statement('insert', table_name, columns, len(chunk)), values)
+                inserted += len(chunk)
+                chunks += 1
+                if lastrowid:
+                    if first_id is None:
+                        first_id = str(lastrowid)
+                    last_id = str(lastrowid + len(chunk) - 1)
+        except ValueError as error:
+            return(f"ERROR: {error}\n{inserted} records were inserted before the failure.")
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table.\n{inserted} records were inserted before the failure.")
+        return({"inserted": inserted, "chunks": chunks, "first_id": first_id, "last_id": last_id})
+
+    async def delete_record(self, table_name: str, record_id: str):
+        '''
+            Deletes a record from table given, according to the ID sent.
+            Return its ID.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            await self._execute(MSQL.statement('delete', table_name), (record_id,))
+            return({"id": record_id})
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\nawait db.delete_record('test_table', 12345)")
+
+    async def find_record(self, table_name: str, record_id: str):
+        '''
+            Finds and returns a record from table given, according to the ID sent.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            result = await self._execute(MSQL.statement('select', table_name), (record_id,), fetch='one')
+            return(list(result))
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\nawait db.find_record('test_table', 12345)")
+
+    async def find_records(self, table_name: str, column: str, value: str):
+        '''
+            Finds and returns a record(s) from table given, according to the column/value given.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            return(await self._execute(f"select * from {table_name} where {column}=%s", (value,), fetch='all'))
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the columns given don't exist\nExample of use:\nawait db.find_records('test_table', 'name', 'john')")
+
+    async def find_all_records(self, table_name: str):
+        '''
+            Finds and returns all the records of the table given.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            return(await self._execute(f"select * from {table_name}", fetch='all'))
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\nawait db.find_all_records('test_table')")
+
+    async def update_record(self, table_name: str, columns: tuple, values: tuple, record_id: str):
+        '''
+            Update a record from table given, according to the columns/values given.
+            Choose the record to update by the id specified.
+            Return the ID.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            sql_line = MSQL.statement('update', table_name, tuple(columns))
+            await self._execute(sql_line, tuple(values) + (record_id,))
+            return({"id": record_id})
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\nawait db.update_record('test_table',('name', 'address'), ('bob', 'new york'),'12345')")
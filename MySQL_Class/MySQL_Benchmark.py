@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from MySQL_Class import MSQL
+
+# End to end benchmarks of MSQL, run against a MySQL server or the embedded SQLite backend #
+# Example of use:
+#   python MySQL_Benchmark.py --backend sqlite --sizes 1000 100000 --concurrency 1 4 16
+#   python MySQL_Benchmark.py --host localhost --user root --password 123456 --output before.json
+
+OPERATIONS = ('insert', 'bulk_insert', 'point_lookup', 'range_scan', 'update', 'delete')
+TABLE_COLUMNS = '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), address VARCHAR(255), age INT)'
+
+
+def latency_summary(latencies: list):
+    '''
+        Returns the percentiles of a list of latencies (seconds), in milliseconds.
+    '''
+    if not latencies:
+        return({"p50": None, "p95": None, "p99": None, "max": None, "mean": None})
+    latencies = sorted(latencies)
+    percentile = lambda share: latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000
+    return({"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99),
+            "max": latencies[-1] * 1000, "mean": sum(latencies) / len(latencies) * 1000})
+
+
+def make_row(rng: random.Random):
+    '''
+        A random (name, address, age) record.
+    '''
+    return((f"user{rng.randrange(10 ** 9)}", f"street {rng.randrange(10 ** 4)}", rng.randrange(100)))
+
+
+def prepare_table(db: MSQL, table_name: str, size: int, seed: int):
+    '''
+        Creates the table (dropping it if it exists) and loads size records to it,
+        their IDs being 1 to size.
+    '''
+    result = db.drop_table(table_name)
+    if type(result) == str:
+        raise Exception(result)
+    result = db.create_table(table_name, TABLE_COLUMNS)
+    if type(result) == str:
+        raise Exception(result)
+    rng = random.Random(seed)
+    result = db.insert_records(table_name, ('name', 'address', 'age'), (make_row(rng) for _ in range(size)), 5000)
+    if type(result) == str:
+        raise Exception(result)
+
+
+def run_operation(db: MSQL, table_name: str, operation: str, size: int, ops: int, concurrency: int,
+                  seed: int, bulk_rows: int=1000, scan_rows: int=100):
+    '''
+        Runs an operation ops times, split between concurrency threads sharing the object,
+        and returns its throughput and latency percentiles.
+        The IDs used are drawn from 1 to size with a seeded generator per thread,
+        so a run is repeated by running it with the same seed.
+        delete removes distinct records (from the top of the table down), so it runs
+        at most size times, and should run last.
+    '''
+    columns = ('name', 'address', 'age')
+    latencies, errors = [], [0]
+    results_lock = threading.Lock()
+    to_delete = iter(range(size, 0, -1))
+    delete_lock = threading.Lock()
+    if operation == 'delete':
+        ops = min(ops, size)
+    shares = [ops // concurrency + (1 if index < ops % concurrency else 0) for index in range(concurrency)]
+
+    def call(rng: random.Random):
+        if operation == 'insert':
+            return db.insert_record(table_name, columns, make_row(rng))
+        if operation == 'bulk_insert':
+            return db.insert_records(table_name, columns, [make_row(rng) for _ in range(bulk_rows)], bulk_rows)
+        if operation == 'point_lookup':
+            return db.find_record(table_name, rng.randint(1, size))
+        if operation == 'range_scan':
+            pages = db.scan(table_name, page_size=scan_rows, start_after=rng.randint(0, max(size - scan_rows, 0)))
+            if type(pages) == str:
+                return pages
+            return next(pages, None)
+        if operation == 'update':
+            return db.update_record(table_name, ('age',), (rng.randrange(100),), str(rng.randint(1, size)))
+        if operation == 'delete':
+            with delete_lock:
+                record_id = next(to_delete)
+            return db.delete_record(table_name, str(record_id))
+        raise ValueError(f"ERROR: unknown operation {operation}")
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        worker_latencies, worker_errors = [], 0
+        for _ in range(shares[index]):
+            started = time.perf_counter()
+            try:
+                result = call(rng)
+            except Exception as error:
+                result = f"ERROR: {error}"
+            worker_latencies.append(time.perf_counter() - started)
+            if type(result) == str and result.startswith("ERROR"):
+                worker_errors += 1
+        with results_lock:
+            latencies.extend(worker_latencies)
+            errors[0] += worker_errors
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    rows = ops * bulk_rows if operation == 'bulk_insert' else ops
+    return({"operation": operation, "table_size": size, "concurrency": concurrency, "ops": ops,
+            "errors": errors[0], "seconds": seconds, "ops_per_second": ops / seconds if seconds else 0.0,
+            "rows_per_second": rows / seconds if seconds else 0.0, "latency_ms": latency_summary(latencies)})
+
+
+def run_benchmarks(connection_args: dict, sizes=(1000, 10000), concurrency=(1, 4), operations=OPERATIONS,
+                   ops: int=1000, bulk_rows: int=1000, scan_rows: int=100, seed: int=42, on_result: callable=None):
+    '''
+        Runs every operation for every table size and concurrency level, on a table
+        loaded from scratch for each (size, concurrency) pair.
+        Returns a JSON-ready report - the configuration, the environment and a result per run.
+
+        Params
+        ------
+            1. connection_args - Keyword arguments of MSQL (backend, database_name and so on),
+               the object is created pooled so the threads share it.
+            2. sizes - Table sizes (records loaded before the operations run).
+            3. concurrency - Amounts of threads.
+            4. operations - Any of OPERATIONS, run in the order given.
+            5. ops - Calls per operation and run.
+            6. bulk_rows - Records per bulk_insert call.
+            7. scan_rows - Records per range_scan call.
+            8. seed - Seeds the generated records and IDs.
+            9. on_result - If given, it's called with each result as it's done.
+    '''
+    for operation in operations:
+        if operation not in OPERATIONS:
+            raise ValueError(f"ERROR: unknown operation {operation}, use one of {', '.join(OPERATIONS)}")
+
+    results = []
+    started = time.time()
+    for size in sizes:
+        for threads in concurrency:
+            db = MSQL(**dict(connection_args, pooled=True, pool_min=1, pool_max=max(threads, 1)))
+            table_name = f"msql_bench_{size}"
+            try:
+                prepare_table(db, table_name, size, seed)
+                for operation in operations:
+                    result = run_operation(db, table_name, operation, size, ops, threads, seed, bulk_rows, scan_rows)
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+            finally:
+                db.drop_table(table_name)
+                db.close()
+
+    return({"backend": connection_args.get("backend", 'mysql'), "started": started,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "config": {"sizes": list(sizes), "concurrency": list(concurrency), "operations": list(operations),
+                       "ops": ops, "bulk_rows": bulk_rows, "scan_rows": scan_rows, "seed": seed},
+            "results": results})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks MSQL operations, reporting ops/sec and latency percentiles as JSON.')
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='mysql')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='123456')
+    parser.add_argument('--database', default=None,
+                        help="MySQL database (created if missing, msql_bench by default) or SQLite file (a temporary one by default)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--operations', nargs='+', default=list(OPERATIONS), choices=OPERATIONS)
+    parser.add_argument('--ops', type=int, default=1000, help='calls per operation and run')
+    parser.add_argument('--bulk-rows', type=int, default=1000)
+    parser.add_argument('--scan-rows', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='file to write the JSON report to (stdout by default)')
+    args = parser.parse_args(argv)
+
+    temporary_dir = None
+    if args.backend == 'sqlite':
+        database_name = args.database
+        if database_name is None:
+            # a file, since an in-memory database can't be shared by a pool
+            temporary_dir = tempfile.TemporaryDirectory()
+            database_name = os.path.join(temporary_dir.name, 'msql_bench.db')
+        connection_args = {"host_ip": None, "username": None, "password": None,
+                           "database_name": database_name, "backend": 'sqlite'}
+    else:
+        database_name = args.database or 'msql_bench'
+        server = MSQL(args.host, args.user, args.password)
+        dbs = server.show_dbs()
+        if type(dbs) == str:
+            sys.exit(dbs)
+        if database_name not in dbs["DBs"]:
+            result = server.create_db(database_name)
+            if type(result) == str:
+                sys.exit(result)
+        server.close()
+        connection_args = {"host_ip": args.host, "username": args.user, "password": args.password,
+                           "database_name": database_name}
+
+    progress = lambda result: print(f"{result['operation']:>12} size={result['table_size']} threads={result['concurrency']}"
+                                    f" {result['ops_per_second']:.1f} ops/s p99={result['latency_ms']['p99']:.3f}ms",
+                                    file=sys.stderr)
+    try:
+        report = run_benchmarks(connection_args, args.sizes, args.concurrency, args.operations, args.ops,
+                                args.bulk_rows, args.scan_rows, args.seed, on_result=progress)
+    finally:
+        if temporary_dir is not None:
+            temporary_dir.cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
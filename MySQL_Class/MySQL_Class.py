@@ -1,4 +1,658 @@
-import mysql.connector as connector
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import lru_cache, wraps
+from itertools import islice
+
+try:
+    import mysql.connector as connector
+except ImportError:
+    # only the sqlite backend can be used
+    connector = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# amount of generated statement texts kept by MSQL.statement
+STATEMENT_CACHE_SIZE = 1024
+
+# most placeholders MySQL allows in a prepared statement,
+# the multi-row statements are split so they stay under it
+MAX_PLACEHOLDERS = 65535
+
+# errors after which a connection is considered lost
+CONNECTION_ERRORS = (connector.errors.InterfaceError, connector.errors.OperationalError) if connector is not None else ()
+
+
+class ConnectionPool:
+    '''
+        A thread-safe pool of connections to a MySQL server.
+        Connections are opened on demand up to max_size, and idle ones
+        are handed out again (last returned first) instead of reconnecting.
+
+        Attributes
+        ----------
+        connect: callable
+            A function that opens and returns a new connection.
+        min_size: int
+            Amount of connections opened upon creating the pool.
+        max_size: int
+            Maximum amount of connections open at the same time.
+        timeout: float
+            Seconds to wait for a free connection when all of them are in use.
+        prefill: bool
+            Open min_size connections upon creation (otherwise they're opened on demand).
+
+        Methods
+        -------
+        get():
+            Checks out an idle connection, opening a new one if the pool isn't full.
+        put(connection, discard=False):
+            Returns a connection to the pool (or closes it if discard is True).
+        close():
+            Closes all the idle connections.
+    '''
+    def __init__(self, connect, min_size: int=1, max_size: int=10, timeout: float=30.0, prefill: bool=True):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("ERROR: pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.connect = connect
+        self.min_size, self.max_size, self.timeout = min_size, max_size, timeout
+        self.idle = []
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        if prefill:
+            for _ in range(self.min_size):
+                self.idle.append(self.connect())
+                self.size += 1
+
+    def get(self):
+        '''
+            Checks out a connection.
+            An idle one is preferred, if there is none and the pool isn't full
+            a new connection is opened.
+
+            Raises
+            ------
+            TimeoutError:
+                If no connection became free within self.timeout seconds.
+        '''
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise Exception("ERROR: the connection pool is closed")
+                if self.idle:
+                    return self.idle.pop()
+                if self.size < self.max_size:
+                    # reserving the slot before connecting, so the handshake
+                    # happens outside of the lock
+                    self.size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"ERROR: no free connection in the pool after {self.timeout} seconds")
+                self.condition.wait(remaining)
+
+        try:
+            return self.connect()
+        except:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def put(self, connection, discard: bool=False):
+        '''
+            Returns a connection to the pool.
+            If discard is True (or the pool was closed) the connection
+            is closed instead, freeing its slot.
+        '''
+        with self.condition:
+            if discard or self.closed:
+                self.size -= 1
+            else:
+                self.idle.append(connection)
+                connection = None
+            self.condition.notify()
+
+        if connection is not None:
+            try:
+                connection.close()
+            except:
+                pass
+
+    def close(self):
+        '''
+            Closes the idle connections, connections currently checked out
+            are closed once they are returned.
+        '''
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            self.condition.notify_all()
+
+        for connection in idle:
+            try:
+                connection.close()
+            except:
+                pass
+
+
+class RecordCache:
+    '''
+        A thread-safe in-process cache of records by table and ID,
+        least recently used records are evicted past max_size,
+        and records expire ttl seconds after being cached.
+
+        Attributes
+        ----------
+        max_size: int
+            Default maximum amount of records cached per table.
+        ttl: float
+            Default seconds a record stays cached (None - no expiry).
+        tables: dict
+            Tables to cache, each mapped to its own settings overriding
+            the defaults, ie {'users': {'max_size': 50000, 'ttl': 5}}.
+            None - every table is cached with the defaults.
+        hits, misses, evictions, expirations: int
+            Counters, to help sizing the cache.
+
+        Methods
+        -------
+        caches(table_name):
+            Whether records of the table are cached.
+        get(table_name, key):
+            Returns the cached record or None.
+        put(table_name, key, record, generation):
+            Caches a record, unless the table was invalidated since generation.
+        invalidate(table_name, key=None):
+            Drops a record (or the whole table).
+        clear():
+            Drops everything.
+        stats():
+            Returns the counters and the current size.
+    '''
+    def __init__(self, max_size: int=10000, ttl: float=60.0, tables=None):
+        self.max_size, self.ttl = max_size, ttl
+        if tables is None or isinstance(tables, dict):
+            self.tables = tables
+        else:
+            self.tables = {table_name: {} for table_name in tables}
+
+        self.records = {}
+        self.generations = {}
+        self.hits, self.misses, self.evictions, self.expirations = 0, 0, 0, 0
+        self.lock = threading.Lock()
+
+    def caches(self, table_name: str):
+        return self.tables is None or table_name in self.tables
+
+    def generation(self, table_name: str):
+        '''
+            Returns a number that changes whenever the table is invalidated,
+            taken before reading a record so a read that raced a write isn't cached.
+        '''
+        with self.lock:
+            return self.generations.get(table_name, 0)
+
+    def get(self, table_name: str, key: str):
+        with self.lock:
+            records = self.records.get(table_name)
+            entry = None if records is None else records.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires, record = entry
+            if expires is not None and expires <= time.monotonic():
+                del records[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            records.move_to_end(key)
+            self.hits += 1
+            return record
+
+    def put(self, table_name: str, key: str, record, generation: int):
+        settings = self.tables.get(table_name, {}) if self.tables is not None else {}
+        max_size = settings.get('max_size', self.max_size)
+        ttl = settings.get('ttl', self.ttl)
+        expires = None if ttl is None else time.monotonic() + ttl
+
+        with self.lock:
+            if self.generations.get(table_name, 0) != generation:
+                return
+            records = self.records.setdefault(table_name, OrderedDict())
+            records[key] = (expires, record)
+            records.move_to_end(key)
+            while len(records) > max_size:
+                records.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table_name: str, key: str=None):
+        with self.lock:
+            self.generations[table_name] = self.generations.get(table_name, 0) + 1
+            records = self.records.get(table_name)
+            if records is None:
+                return
+            if key is None:
+                records.clear()
+            else:
+                records.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            for table_name in self.records:
+                self.generations[table_name] = self.generations.get(table_name, 0) + 1
+            self.records = {}
+
+    def stats(self):
+        with self.lock:
+            return({"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "expirations": self.expirations,
+                    "size": sum(len(records) for records in self.records.values())})
+
+
+class QueryStats:
+    '''
+        Thread-safe statistics of MSQL calls.
+        For every method and table it keeps the amount of calls, the rows and (estimated)
+        bytes they returned, errors by type, and the latest latencies
+        (from which the p50/p95/p99 are computed).
+        Calls slower than slow_query_threshold are kept in a slow query log,
+        with the statements they executed and the shape (not the values) of their parameters.
+
+        Attributes
+        ----------
+        slow_query_threshold: float
+            Seconds from which a call is logged as slow (None - no log).
+        hook: callable
+            If given, it's called with an event dict after every call.
+        samples: int
+            Amount of latest latencies kept per method and table.
+        slow_queries: deque
+            The latest slow calls (up to slow_log_size).
+
+        Methods
+        -------
+        record(event):
+            Adds a finished call.
+        snapshot():
+            Returns the statistics gathered so far.
+        reset():
+            Drops the statistics gathered so far.
+    '''
+    def __init__(self, slow_query_threshold: float=1.0, hook=None, samples: int=2048, slow_log_size: int=100):
+        self.slow_query_threshold, self.hook, self.samples = slow_query_threshold, hook, samples
+        self.slow_log_size = slow_log_size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+            self.slow_queries = deque(maxlen=self.slow_log_size)
+
+    def record(self, event: dict):
+        with self.lock:
+            entry = self.entries.get((event["method"], event["table"]))
+            if entry is None:
+                entry = {"calls": 0, "rows": 0, "bytes": 0, "seconds": 0.0,
+                         "errors": {}, "latencies": deque(maxlen=self.samples)}
+                self.entries[(event["method"], event["table"])] = entry
+            entry["calls"] += 1
+            entry["rows"] += event["rows"]
+            entry["bytes"] += event["bytes"]
+            entry["seconds"] += event["seconds"]
+            entry["latencies"].append(event["seconds"])
+            if event["error"] is not None:
+                entry["errors"][event["error"]] = entry["errors"].get(event["error"], 0) + 1
+            if self.slow_query_threshold is not None and event["seconds"] >= self.slow_query_threshold:
+                self.slow_queries.append(event)
+
+        if self.hook is not None:
+            try:
+                self.hook(event)
+            except:
+                pass
+
+    def snapshot(self):
+        '''
+            Returns the statistics per method and table, ie:
+            {"calls": [{"method": 'find_record', "table": 'users', "calls": 10, "rows": 10, "bytes": 640,
+                        "errors": {}, "p50": 0.0004, "p95": 0.0009, "p99": 0.001, "max": 0.001}],
+             "slow_queries": [...]}
+        '''
+        with self.lock:
+            calls = []
+            for (method, table_name), entry in self.entries.items():
+                latencies = sorted(entry["latencies"])
+                percentile = lambda share: latencies[min(len(latencies) - 1, int(share * len(latencies)))]
+                calls.append({"method": method, "table": table_name, "calls": entry["calls"],
+                              "rows": entry["rows"], "bytes": entry["bytes"], "seconds": entry["seconds"],
+                              "errors": dict(entry["errors"]), "p50": percentile(0.50),
+                              "p95": percentile(0.95), "p99": percentile(0.99), "max": latencies[-1]})
+            return({"calls": calls, "slow_queries": list(self.slow_queries)})
+
+    @staticmethod
+    def estimate_bytes(result):
+        '''
+            Roughly estimates the size of the data a call returned
+            (the length of strings/bytes and 8 bytes for anything else).
+        '''
+        if isinstance(result, dict):
+            if "Columns" in result and "Rows" in result:
+                return sum(len(buffer) * buffer.itemsize if isinstance(buffer, array) else QueryStats.estimate_bytes(buffer)
+                           for buffer in result["Columns"].values())
+            if "records" in result and isinstance(result["records"], dict):
+                return QueryStats.estimate_bytes(list(result["records"].values()))
+            return 0
+        if isinstance(result, (list, tuple)):
+            return sum(QueryStats.estimate_bytes(value) if isinstance(value, (list, tuple))
+                       else len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+                       for value in result)
+        return 0
+
+    @staticmethod
+    def count_rows(result):
+        '''
+            Returns the amount of records a call returned or wrote.
+        '''
+        if isinstance(result, list):
+            return 1 if result and not isinstance(result[0], (list, tuple)) else len(result)
+        if isinstance(result, dict):
+            for key in ("Rows", "inserted", "deleted", "records", "rows"):
+                if isinstance(result.get(key), int):
+                    return result[key]
+            if isinstance(result.get("records"), dict):
+                return len(result["records"])
+            if "id" in result:
+                return 1
+        return 0
+
+
+def instrumented(method):
+    '''
+        Measures the calls of an MSQL method when its statistics are enabled
+        (otherwise the method is called as is).
+        Only the outermost call is measured when methods call each other.
+    '''
+    takes_table = method.__code__.co_varnames[1:2] == ('table_name',)
+
+    @wraps(method)
+    def measure(self, *args, **kwargs):
+        stats = self.query_stats
+        if stats is None or getattr(self.local, 'query', None) is not None:
+            return method(self, *args, **kwargs)
+
+        query = {"statements": [], "params": [], "error": None}
+        self.local.query = query
+        result = None
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+            return result
+        except Exception as error:
+            query["error"] = query["error"] or type(error).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.local.query = None
+            if query["error"] is None and isinstance(result, str) and result.startswith("ERROR"):
+                # an error returned without a failed statement behind it (ie invalid arguments,
+                # a record that wasn't found or a connection that couldn't be made)
+                query["error"] = "Error"
+            table_name = (args[0] if args else kwargs.get('table_name')) if takes_table else None
+            stats.record({"method": method.__name__, "table": table_name, "seconds": seconds,
+                          "rows": QueryStats.count_rows(result), "bytes": QueryStats.estimate_bytes(result),
+                          "error": query["error"], "statements": query["statements"], "params": query["params"],
+                          "time": time.time()})
+    return measure
+
+
+class _Transaction:
+    '''
+        The state of an open MSQL.transaction()/batch() on one thread.
+
+        Attributes
+        ----------
+        connection:
+            The connection every call of the thread is pinned to.
+        max_ops: int
+            Commit once this many writes were made (None - only on exit).
+        max_delay: float
+            Commit once this many seconds passed since the last commit (None - only on exit).
+        ops: int
+            Writes made since the last commit.
+        commits: int
+            Commits made so far.
+        touched: set
+            (table, ID) of records written since the last commit.
+        after_commit: callable
+            Called with the transaction after every commit.
+    '''
+    def __init__(self, connection, max_ops: int=None, max_delay: float=None, after_commit=None):
+        self.connection = connection
+        self.max_ops, self.max_delay = max_ops, max_delay
+        self.ops, self.commits = 0, 0
+        self.touched = set()
+        self.after_commit = after_commit
+        self.last_commit = time.monotonic()
+
+    def commit(self):
+        self.connection.commit()
+        self.ops = 0
+        self.commits += 1
+        self.last_commit = time.monotonic()
+        if self.after_commit is not None:
+            self.after_commit(self)
+        self.touched = set()
+
+    def write_made(self):
+        '''
+            Counts a write, and commits if one of the bounds was reached.
+        '''
+        self.ops += 1
+        if self.max_ops is not None and self.ops >= self.max_ops:
+            self.commit()
+        elif self.max_delay is not None and time.monotonic() - self.last_commit >= self.max_delay:
+            self.commit()
+
+
+class SQLiteCursor:
+    '''
+        A cursor over an SQLite connection, with the interface of a mysql.connector cursor
+        that MSQL uses (execute, fetchone/fetchmany/fetchall, column_names, lastrowid, rowcount).
+        Statements are translated from MySQL's dialect before they're executed (see translate).
+
+        Attributes
+        ----------
+        cursor: sqlite3.Cursor
+            The underlying cursor.
+        rows: list
+            Rows of a translated SHOW statement (None for other statements).
+        column_names: tuple
+            Names of the columns of the last result.
+        lastrowid: int
+            The ID generated by the last insert, the first one for a multi-row insert (as in MySQL).
+        rowcount: int
+            Records affected by the last statement.
+    '''
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+        self.rows = None
+        self.column_names = ()
+        self.lastrowid, self.rowcount = None, -1
+
+    def execute(self, sql_line: str, values=None):
+        kind, sql_line = SQLiteCursor.translate(sql_line)
+        self.rows = None
+        if kind == 'noop':
+            self.column_names, self.rowcount = (), 0
+            return
+        if kind == 'databases':
+            self.rows = [(row[1],) for row in self.cursor.execute("PRAGMA database_list")]
+            self.column_names = ('Database',)
+            return
+        if kind == 'tables':
+            self.rows = [(row[0],) for row in self.cursor.execute(
+                "select name from sqlite_master where type='table' and name not like 'sqlite_%' order by name")]
+            self.column_names = ('Tables',)
+            return
+        if kind == 'columns':
+            self.rows = SQLiteCursor.describe(self.cursor, sql_line)
+            self.column_names = ('Field', 'Type', 'Null', 'Key', 'Default', 'Extra')
+            return
+
+        self.cursor.execute(sql_line, () if values is None else tuple(values))
+        self.column_names = tuple(column[0] for column in self.cursor.description or ())
+        self.rowcount = self.cursor.rowcount
+        self.lastrowid = self.cursor.lastrowid
+        if self.lastrowid and self.rowcount > 1 and sql_line.lstrip()[:6].lower() == 'insert':
+            self.lastrowid -= self.rowcount - 1
+
+    def fetchone(self):
+        if self.rows is not None:
+            return self.rows.pop(0) if self.rows else None
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size: int=1):
+        if self.rows is not None:
+            rows, self.rows = self.rows[:size], self.rows[size:]
+            return rows
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        if self.rows is not None:
+            rows, self.rows = self.rows, []
+            return rows
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+    @staticmethod
+    def describe(cursor, table_name: str):
+        '''
+            Describes a table the way MySQL's SHOW COLUMNS does -
+            (Field, Type, Null, Key, Default, Extra) per column.
+        '''
+        columns = cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
+        if not columns:
+            raise sqlite3.OperationalError(f"no such table: {table_name}")
+        rows = []
+        for _, name, column_type, not_null, default, primary_key in columns:
+            # an INTEGER PRIMARY KEY is an alias of the rowid, filled when NULL is sent
+            auto_increment = bool(primary_key) and column_type.upper() == 'INTEGER'
+            rows.append((name, column_type.lower(), 'NO' if not_null or primary_key else 'YES',
+                         'PRI' if primary_key else '', default, 'auto_increment' if auto_increment else ''))
+        return(rows)
+
+    @staticmethod
+    @lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def translate(sql_line: str):
+        '''
+            Translates a MySQL statement to SQLite, returns its kind and the statement.
+            %s => ?
+            id INT AUTO_INCREMENT PRIMARY KEY => id INTEGER PRIMARY KEY AUTOINCREMENT
+            (id INT NOT NULL AUTO_INCREMENT, ..., PRIMARY KEY (id)) => (id INTEGER PRIMARY KEY AUTOINCREMENT, ...)
+            CREATE TABLE ... ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 => the table options are dropped
+            ON DUPLICATE KEY UPDATE a=VALUES(a) => ON CONFLICT DO UPDATE SET a=excluded.a
+            SHOW DATABASES/TABLES/COLUMNS IN table => ('databases'/'tables'/'columns', table)
+            CREATE DATABASE name => ('noop', ...), the database is the file opened
+        '''
+        if re.match(r'\s*SHOW\s+DATABASES\b', sql_line, re.I):
+            return('databases', sql_line)
+        if re.match(r'\s*SHOW\s+TABLES\b', sql_line, re.I):
+            return('tables', sql_line)
+        show_columns = re.match(r'\s*SHOW\s+COLUMNS\s+(?:IN|FROM)\s+(\w+)', sql_line, re.I)
+        if show_columns:
+            return('columns', show_columns.group(1))
+        if re.match(r'\s*CREATE\s+DATABASE\b', sql_line, re.I):
+            return('noop', sql_line)
+
+        sql_line = sql_line.replace('%s', '?')
+        integer_type = r'\s+(?:TINY|SMALL|MEDIUM|BIG)?INT(?:EGER)?(?:\(\d+\))?(?:\s+UNSIGNED)?(?:\s+NOT\s+NULL)?'
+        integer_column = r'\b(\w+)' + integer_type
+        if re.match(r'\s*CREATE\s+TABLE\b', sql_line, re.I):
+            # table options follow the columns' closing bracket
+            end = sql_line.rfind(')') + 1
+            options = re.sub(r'\b(?:ENGINE|AUTO_INCREMENT|(?:DEFAULT\s+)?(?:CHARSET|CHARACTER\s+SET|COLLATE))\s*=?\s*\w+',
+                             '', sql_line[end:], flags=re.I)
+            sql_line = sql_line[:end] + options.replace(',', '').rstrip()
+
+            # an AUTO_INCREMENT column made the key by a PRIMARY KEY (column) constraint
+            for column in re.findall(integer_column + r'\s+AUTO_INCREMENT\b(?!\s+PRIMARY)', sql_line, re.I):
+                constraint = re.compile(r',\s*PRIMARY\s+KEY\s*\(\s*' + column + r'\s*\)', re.I)
+                if constraint.search(sql_line):
+                    sql_line = constraint.sub('', sql_line)
+                    sql_line = re.sub(r'\b' + column + integer_type + r'\s+AUTO_INCREMENT\b(?:\s+NOT\s+NULL)?',
+                                      f'{column} INTEGER PRIMARY KEY AUTOINCREMENT', sql_line, count=1, flags=re.I)
+        sql_line = re.sub(integer_column + r'\s+(?:AUTO_INCREMENT\s+PRIMARY\s+KEY|PRIMARY\s+KEY\s+AUTO_INCREMENT)\b',
+                          r'\1 INTEGER PRIMARY KEY AUTOINCREMENT', sql_line, flags=re.I)
+        sql_line = re.sub(r'\s*\bAUTO_INCREMENT\b(\s*=\s*\d+)?', '', sql_line, flags=re.I)
+        duplicate = re.search(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', sql_line, re.I)
+        if duplicate:
+            updates = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', sql_line[duplicate.end():], flags=re.I)
+            sql_line = sql_line[:duplicate.start()] + 'ON CONFLICT DO UPDATE SET' + updates
+        return('sql', sql_line)
+
+
+class SQLiteConnection:
+    '''
+        An in-process SQLite database, with the interface of a mysql.connector connection
+        that MSQL uses, so MSQL can run without a MySQL server (backend='sqlite').
+        File databases are opened in WAL mode, so readers don't block the writer,
+        and writes are committed when MSQL commits (once per call, or once per
+        transaction/batch), not per statement.
+
+        Attributes
+        ----------
+        connection: sqlite3.Connection
+            The underlying connection.
+        unread_result: bool
+            Always False, an SQLite cursor can be dropped with rows left unread.
+    '''
+    unread_result = False
+
+    def __init__(self, database: str, timeout: float=30.0):
+        # the connection is lent to one thread at a time by MSQL's lock/pool
+        self.connection = sqlite3.connect(database, timeout=timeout, check_same_thread=False)
+        if database != ':memory:':
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self, buffered: bool=None, prepared: bool=None):
+        # sqlite3 keeps its own cache of prepared statements
+        return SQLiteCursor(self.connection)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def ping(self, reconnect: bool=False):
+        self.connection.execute("select 1")
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self.connection.close()
 
 
 class MSQL:
@@ -18,34 +672,111 @@ class MSQL:
             A database to query.
         cursor: mysql cursor object
             An object relying on the connection made, that executes the queries.
+            (None in pooled mode, where every call uses a cursor of its own)
+        pool: ConnectionPool
+            When pooled=True, the connections the methods borrow from
+            (None otherwise).
+        prepared: bool
+            Whether writes are executed through server-side prepared statements,
+            kept open per connection (up to prepared_cache_size of them).
+        record_cache: RecordCache
+            When enabled, the records find_record serves from memory (None otherwise).
+        query_stats: QueryStats
+            When enabled, the measurements of the calls (None otherwise).
+        cache_schema: bool
+            Whether table schemas are cached (serving show_tables/show_columns) and used
+            to validate and coerce columns/values before a query is sent.
+        backend: str
+            'mysql', or 'sqlite' for an in-process SQLite database (database_name is its file).
+        lazy: bool
+            Whether connections are opened on first use instead of upon initialization.
+        ping_after: float
+            Seconds of idleness after which a connection is pinged before it's reused.
+        read_retries: int
+            Times the reads are retried on a new connection after the connection was lost.
+        retry_backoff: float
+            Seconds to wait before the first retry (doubled on each one after).
 
         Methods 
         -------
         reconnect():
             Simply runs the init function again.
             that means it attempts reconnecting the object to the server.
+        connection_args():
+            Returns the keyword arguments the object was created with.
+        close():
+            Closes the connection (or all the pooled connections).
+        transaction():
+            A context manager, writes inside it are committed once on exit
+            (or rolled back if an exception is raised).
+        batch(max_ops: int=500, max_delay: float=1.0):
+            Same as transaction, but also group commits every max_ops writes / max_delay seconds.
+        enable_record_cache(max_size: int=10000, ttl: float=60.0, tables=None):
+            Makes find_record serve records from an in-process cache,
+            invalidated by update_record and delete_record.
+        disable_record_cache():
+            Drops the record cache.
+        cache_stats():
+            Returns the record cache's hit/miss/eviction counters.
+        enable_stats(slow_query_threshold: float=1.0, hook=None, samples: int=2048):
+            Starts measuring the calls - latencies, rows, bytes, errors and slow queries.
+        disable_stats():
+            Stops measuring the calls.
+        stats():
+            Returns a snapshot of the measurements.
         show_dbs():
             Returns a list of the databases in the server.
         show_tables():
             Returns a list of the tables in the database set in self.database_name .
         show_columns(table_name):
             Returns a list of the columns in the table in the database set in self.database_name .
+        get_schema(table_name: str, refresh: bool=False):
+            Returns the columns, types and primary key of a table, loaded once and cached.
+        refresh_schema(table_name: str=None):
+            Drops cached schemas (of one table or the whole database), reloading them on next use.
         create_db(db_name):
             Creates a database with the name given. Also sets in the self.database_name, 
             in case it's needed for a sort of db initialization script.
         create_table(table_name: str, columns: str):
             Creates a table with he given name and columns specified, 
             in the database set in self.database_name .
+        drop_table(table_name: str, if_exists: bool=True):
+            Drops the table given.
         insert_record(table_name: str, columns: tuple, values: tuple):
             Inserts a record to the given database, table and fills
             the record's values according the values.
+        insert_records(table_name: str, columns: tuple, rows, chunk_size: int=1000):
+            Inserts many records (any iterable of value tuples) with multi-row
+            INSERT statements, committing once per chunk.
+        upsert_records(table_name: str, columns: tuple, rows, update_columns: tuple=None, chunk_size: int=1000):
+            Same as insert_records, but records whose key already exists are updated instead.
+        bulk_load(table_name: str, columns: tuple, source, chunk_size: int=10000):
+            Loads records (an iterable, or a tab delimited file) with LOAD DATA LOCAL INFILE,
+            falling back to insert_records if the server doesn't allow it.
         delete_record(table_name: str, record_id: str):
             Deletes a record with the given ID from the database and table specified.
+        delete_records(table_name: str, record_ids, chunk_size: int=1000):
+            Deletes the records with the given IDs, in chunked IN deletes within one transaction.
         find_record(table_name: str, record_id: str):
             Finds a record with the ID specified inside the database+db given.
         find_records(table_name: str, columns: tuple, values: tuple):
             Finds a record(s) in the database+table specified, 
             by the criteria of the column(s)/value(s).
+        find_records_by_ids(table_name: str, record_ids, chunk_size: int=1000):
+            Finds the records with the given IDs, in chunked IN queries.
+        find_all_records(table_name: str):
+            Finds all the records in the table specified.
+        fetch_columnar(table_name: str, column: str=None, value=None, batch_size: int=10000, use_numpy: bool=False):
+            Returns the records by column, as typed arrays built from streamed batches.
+        iter_records(table_name: str, column: str, value: str, batch_size: int=1000):
+            Same as find_records, but returns a generator streaming the records in batches.
+        iter_all_records(table_name: str, batch_size: int=1000):
+            Same as find_all_records, but returns a generator streaming the records in batches.
+        key_range(table_name: str, key: str='id'):
+            Returns the minimum and maximum of a column.
+        scan(table_name: str, key: str='id', page_size: int=1000, start_after=None, where: str=None, params: tuple=()):
+            Returns a generator of pages of the table, ordered by key, using keyset pagination.
+            Each page holds a cursor to resume the scan after it.
         update_record(table_name: str, columns: tuple, values: tuple, record_id: str):
             Updates in the DB/Table given, in a record found by the ID given, and updates 
             the columns specified with the values specified.
@@ -55,12 +786,34 @@ class MSQL:
             helps reformat strings for the queries
         update_record_syntax_help(columns):
             helps reformat strings for the queries
+        statement(operation, table_name, columns, rows=1):
+            Builds (and caches) the SQL text of a query of the given shape.
+        unique_ids(record_ids):
+            Drops duplicate IDs, keeping their order.
+        column_coercer(column_name: str, column_type: str, nullable: bool=True):
+            Returns a function validating/converting values for a column type.
+        coerce_row(coercers: list, row):
+            Applies column coercers to a row of values.
+        column_buffer(column_type: str):
+            Returns an empty typed buffer (array/list) for values of a column type.
+        escape_field(value):
+            Formats a value as a field of a LOAD DATA file.
+        read_delimited(file_path: str):
+            Reads a LOAD DATA file back into tuples of values.
     '''
-    def __init__(self, host_ip: str, username: str, password: str, database_name: str=None):
+    def __init__(self, host_ip: str, username: str, password: str, database_name: str=None,
+                 pooled: bool=False, pool_min: int=1, pool_max: int=10, pool_timeout: float=30.0,
+                 prepared: bool=True, prepared_cache_size: int=64, cache_schema: bool=False,
+                 allow_local_infile: bool=False, lazy: bool=False, ping_after: float=30.0,
+                 read_retries: int=2, retry_backoff: float=0.1, backend: str='mysql'):
         '''
             Upon initialization, the object will connect to the server,
             either with or without a database specified, 
-            and create a cursor used for the queries.
+            and create a cursor used for the queries (unless lazy is set,
+            then the connection is made on first use).
+            In pooled mode a pool of connections is created instead, and every
+            method borrows a connection for the length of the call,
+            so the same object can be shared between threads.
             
             Parameters
             ----------
@@ -72,29 +825,84 @@ class MSQL:
                 Password (for the username) you will execute your queries with.
             database_name: str(optional)
                 A database to query.
+            pooled: bool(optional)
+                Use a pool of connections instead of a single one.
+            pool_min: int(optional)
+                Connections opened upon initialization in pooled mode.
+            pool_max: int(optional)
+                Maximum connections open at the same time in pooled mode.
+            pool_timeout: float(optional)
+                Seconds a call waits for a free connection before failing.
+            prepared: bool(optional)
+                Execute inserts, updates and deletes through server-side prepared statements,
+                so the server parses each statement shape once per connection.
+            prepared_cache_size: int(optional)
+                Maximum prepared statements kept open on each connection.
+            cache_schema: bool(optional)
+                Cache the tables and their columns, serve show_tables/show_columns from the cache
+                and validate columns/values against it before anything is sent to the server.
+            allow_local_infile: bool(optional)
+                Allow the client to send local files for LOAD DATA LOCAL INFILE (used by bulk_load).
+            lazy: bool(optional)
+                Connect on first use instead of upon initialization.
+            ping_after: float(optional)
+                Seconds a connection may stay idle before it's pinged (and replaced if dead)
+                on its next use, None to never ping.
+            read_retries: int(optional)
+                Times a read (show_*, find_*) is retried on a new connection after the
+                connection was lost.
+            retry_backoff: float(optional)
+                Seconds to wait before the first retry, doubled on each one after.
+            backend: str(optional)
+                'mysql', or 'sqlite' to run on an in-process SQLite database instead of a server,
+                then database_name is the database file (':memory:' if not given)
+                and host_ip, username and password are ignored.
+                Example of use:
+                MSQL(None, None, None, 'edge.db', backend='sqlite')
 
             Raises
             ------
             If a connection can't be established, an excpetion will be raised.
+            If the backend is unknown, or an in-memory SQLite database is pooled, a ValueError will be raised.
         '''
         self.host_ip, self.username, self.password, self.database_name = host_ip, username, password, database_name
-        try:  
+        self.pooled, self.pool_min, self.pool_max, self.pool_timeout = pooled, pool_min, pool_max, pool_timeout
+        self.prepared, self.prepared_cache_size = prepared, prepared_cache_size
+        self.cache_schema = cache_schema
+        self.allow_local_infile = allow_local_infile
+        self.lazy, self.ping_after = lazy, ping_after
+        self.read_retries, self.retry_backoff = read_retries, retry_backoff
+        self.backend = backend
+        if backend not in ('mysql', 'sqlite'):
+            raise ValueError(f"ERROR: unknown backend {backend}, use mysql or sqlite")
+        if backend == 'mysql' and connector is None:
+            raise ValueError("ERROR: mysql-connector-python isn't installed, install it or use backend='sqlite'")
+        if backend == 'sqlite':
             if self.database_name == None:
-                self.connection = connector.connect(
-                    host=self.host_ip,
-                    user=self.username,
-                    password=self.password
-                )
-
+                self.database_name = ':memory:'
+            if self.pooled and self.database_name == ':memory:':
+                # every connection would open a database of its own
+                raise ValueError("ERROR: an in-memory SQLite database can't be pooled, give a file as database_name")
+        # {database: {table: schema}} and {database: [tables]}
+        self.schemas, self.table_lists = {}, {}
+        self.schema_lock = threading.Lock()
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.record_cache = None
+        self.query_stats = None
+        try:
+            self.connection, self.cursor = None, None
+            if self.pooled:
+                self.pool = ConnectionPool(self._connect, self.pool_min, self.pool_max, self.pool_timeout,
+                                           prefill=not self.lazy)
             else:
-                self.connection = connector.connect(
-                    host=self.host_ip,
-                    user=self.username,
-                    password=self.password,
-                    database=self.database_name
-                )
-            self.cursor = self.connection.cursor()
+                self.pool = None
+                if not self.lazy:
+                    self.connection = self._connect()
+                    self.cursor = self.connection.cursor()
 
+        except ValueError:
+            raise
         except:
             raise Exception("ERROR: could not connect to database,\n check internet connectivity and/or credenetials")
 
@@ -104,9 +912,480 @@ class MSQL:
             Reruns the init (reconnects to the server, good use case is 
             if midway you need to change details of connection but can't change object)
         '''
-        self.__init__(self.host_ip,self.username,self.password,self.database_name)
+        # the record cache survives reconnecting, but not its records
+        # since the database might have changed
+        record_cache, query_stats = self.record_cache, self.query_stats
+        self.close()
+        self.__init__(**self.connection_args())
+        if record_cache is not None:
+            record_cache.clear()
+            self.record_cache = record_cache
+        self.query_stats = query_stats
+
+    def connection_args(self):
+        '''
+            Returns the keyword arguments the object was created with,
+            so an equivalent object can be created (in another process for example).
+            MSQL(**MSQL_object.connection_args())
+        '''
+        return({"host_ip": self.host_ip, "username": self.username, "password": self.password,
+                "database_name": self.database_name, "pooled": self.pooled, "pool_min": self.pool_min,
+                "pool_max": self.pool_max, "pool_timeout": self.pool_timeout, "prepared": self.prepared,
+                "prepared_cache_size": self.prepared_cache_size, "cache_schema": self.cache_schema,
+                "allow_local_infile": self.allow_local_infile, "lazy": self.lazy, "ping_after": self.ping_after,
+                "read_retries": self.read_retries, "retry_backoff": self.retry_backoff, "backend": self.backend})
+
+    def close(self):
+        '''
+            Closes the connection to the server,
+            or all of the pool's connections in pooled mode.
+        '''
+        try:
+            if self.pool is not None:
+                self.pool.close()
+            elif self.connection is not None:
+                self._drop_connection()
+        except:
+            pass
+
+    def _connect(self):
+        '''
+            Opens a new connection to the server, with the database if one is set
+            (or to the SQLite database file).
+        '''
+        if self.backend == 'sqlite':
+            return SQLiteConnection(self.database_name, self.pool_timeout)
+        connection_args = {"host": self.host_ip, "user": self.username, "password": self.password}
+        if self.database_name != None:
+            connection_args["database"] = self.database_name
+        if self.allow_local_infile:
+            connection_args["allow_local_infile"] = True
+        return connector.connect(**connection_args)
+
+    def enable_record_cache(self, max_size: int=10000, ttl: float=60.0, tables=None):
+        '''
+            Makes find_record serve records from an in-process LRU cache.
+            update_record and delete_record (of this object) invalidate the records they change,
+            changes made by others are seen once the cached record expires.
+
+            Example of use:
+            db.enable_record_cache(max_size=50000, ttl=30, tables={'users': {}, 'products': {'ttl': 300}})
+
+            Parameters
+            ----------
+            max_size: int (optional)
+                Maximum records cached per table.
+            ttl: float (optional)
+                Seconds a record stays cached, None to keep until evicted or invalidated.
+            tables: dict/list (optional)
+                Tables to cache (all of them if None), a dict can override
+                max_size/ttl per table.
+        '''
+        self.record_cache = RecordCache(max_size, ttl, tables)
+        return self.record_cache
+
+    def disable_record_cache(self):
+        self.record_cache = None
+
+    def cache_stats(self):
+        '''
+            Returns the record cache's hits, misses, evictions, expirations and size.
+
+            Raises
+            ------
+            If the record cache isn't enabled, an error will be returned.
+        '''
+        if self.record_cache is None:
+            return("ERROR: The record cache isn't enabled, enable it with enable_record_cache()")
+        return self.record_cache.stats()
+
+    def enable_stats(self, slow_query_threshold: float=1.0, hook=None, samples: int=2048):
+        '''
+            Starts measuring the object's calls, per method and table - latencies (p50/p95/p99),
+            rows, estimated bytes returned and errors by type (the exception of the statement that
+            failed, or Error for an error returned without one, ie a record that wasn't found).
+            Calls slower than slow_query_threshold are kept with the statements they
+            executed and the shape of their parameters (their amount and types, not the values).
+            While disabled (the default) the calls aren't measured at all.
+
+            Example of use:
+            db.enable_stats(slow_query_threshold=0.2, hook=lambda event: print(event["method"], event["seconds"]))
+            ...
+            print(db.stats())
+
+            Parameters
+            ----------
+            slow_query_threshold: float (optional)
+                Seconds from which a call is logged as slow, None to not log.
+            hook: callable (optional)
+                Called with an event dict after every call.
+            samples: int (optional)
+                Latest latencies kept per method and table for the percentiles.
+        '''
+        self.query_stats = QueryStats(slow_query_threshold, hook, samples)
+        return self.query_stats
+
+    def disable_stats(self):
+        self.query_stats = None
+
+    def stats(self):
+        '''
+            Returns a snapshot of the measurements, see QueryStats.snapshot.
+
+            Raises
+            ------
+            If the statistics aren't enabled, an error will be returned.
+        '''
+        if self.query_stats is None:
+            return("ERROR: The statistics aren't enabled, enable them with enable_stats()")
+        return self.query_stats.snapshot()
+
+    def _execute(self, cursor, sql_line: str, values=None):
+        '''
+            Executes a statement on a cursor.
+            While a call is measured, the statement and the shape of its
+            parameters are noted for the slow query log, and so is the type of its error.
+        '''
+        query = getattr(self.local, 'query', None)
+        if query is None:
+            return cursor.execute(sql_line, values)
+
+        query["statements"].append(sql_line)
+        if values is not None:
+            query["params"].append({"count": len(values), "types": sorted({type(value).__name__ for value in values})})
+        try:
+            return cursor.execute(sql_line, values)
+        except Exception as error:
+            query["error"] = type(error).__name__
+            raise
+
+    def _invalidate(self, table_name: str, record_id=None):
+        '''
+            Drops a written record (or the whole table if record_id is None) from the record cache.
+            Inside a transaction it is dropped again after the commit,
+            in case another thread cached the old record meanwhile.
+        '''
+        if self.record_cache is None:
+            return
+        key = None if record_id is None else str(record_id)
+        self.record_cache.invalidate(table_name, key)
+        transaction = getattr(self.local, 'transaction', None)
+        if transaction is not None:
+            transaction.touched.add((table_name, key))
+
+    def _after_commit(self, transaction):
+        if self.record_cache is None:
+            return
+        for table_name, key in transaction.touched:
+            self.record_cache.invalidate(table_name, key)
+
+    def transaction(self):
+        '''
+            A context manager grouping writes into a single transaction.
+            The calls made inside it (on the same thread) share one connection and
+            skip their own commit, a single commit is made on exit,
+            or a rollback if an exception is raised.
+            Nested transactions join the outer one.
+
+            Example of use:
+            with db.transaction():
+                db.insert_record('test_table', ('name',), ('bob',))
+                db.update_record('test_table', ('age',), (22,), '1')
+
+            Notes
+            -----
+            Methods still return an error string instead of raising,
+            check their results to decide whether to raise and roll back.
+            Without a pool the object is locked to the thread for the transaction's length.
+        '''
+        return self._transaction(None, None)
+
+    def batch(self, max_ops: int=500, max_delay: float=1.0):
+        '''
+            Same as transaction(), but group commits along the way,
+            once max_ops writes were made or max_delay seconds passed since the last commit
+            (checked upon each write). On an exception only the writes since
+            the last group commit are rolled back.
+
+            Example of use:
+            with db.batch(max_ops=1000):
+                for name in names:
+                    db.insert_record('test_table', ('name',), (name,))
+
+            Parameters
+            ----------
+            max_ops: int (optional)
+                Writes per commit, None to not bound by amount.
+            max_delay: float (optional)
+                Seconds between commits, None to not bound by time.
+        '''
+        return self._transaction(max_ops, max_delay)
+
+    @contextmanager
+    def _transaction(self, max_ops: int, max_delay: float):
+        current = getattr(self.local, 'transaction', None)
+        if current is not None:
+            yield current
+            return
+
+        connection = self._acquire()
+        transaction = _Transaction(connection, max_ops, max_delay, self._after_commit)
+        self.local.transaction = transaction
+        discard = False
+        try:
+            yield transaction
+            transaction.commit()
+        except:
+            try:
+                connection.rollback()
+            except:
+                # the connection was lost along with the transaction
+                discard = True
+            raise
+        finally:
+            self.local.transaction = None
+            self._release(connection, discard)
+
+    def _commit(self, connection):
+        '''
+            Commits a write, unless it's made inside a transaction/batch,
+            in which case the transaction decides when to commit.
+        '''
+        transaction = getattr(self.local, 'transaction', None)
+        if transaction is None:
+            connection.commit()
+        else:
+            transaction.write_made()
+
+    def _acquire(self):
+        '''
+            Checks out a connection.
+            Inside a transaction - the connection the thread is pinned to.
+            Pooled - takes one out of the pool.
+            Otherwise - locks the single connection, so threads take turns on it.
+        '''
+        transaction = getattr(self.local, 'transaction', None)
+        if transaction is not None:
+            return transaction.connection
+
+        if self.pool is not None:
+            # dead idle connections are dropped until a live one comes out of the pool,
+            # or a new one is opened in their place (a new connection isn't pinged)
+            while True:
+                connection = self.pool.get()
+                if self._alive(connection):
+                    return connection
+                self.pool.put(connection, discard=True)
+
+        self.lock.acquire()
+        try:
+            if self.connection is not None and not self._alive(self.connection):
+                self._drop_connection()
+            if self.connection is None:
+                self.connection = self._connect()
+                self.cursor = self.connection.cursor()
+        except:
+            self.lock.release()
+            raise
+        return self.connection
+
+    def _alive(self, connection):
+        '''
+            Pings a connection if it was idle for more than ping_after seconds,
+            returns whether it's usable.
+        '''
+        last_used = getattr(connection, 'msql_last_used', None)
+        if self.ping_after is None or last_used is None or time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except:
+            return False
+
+    def _drop_connection(self):
+        '''
+            Closes the single connection, the next call opens a new one.
+        '''
+        try:
+            self.connection.close()
+        except:
+            pass
+        self.connection, self.cursor = None, None
+
+    def _release(self, connection, discard: bool=False):
+        '''
+            Returns a connection checked out by _acquire.
+            If discard is True the connection is closed and replaced
+            (used when it is left in a state that can't be reused).
+        '''
+        transaction = getattr(self.local, 'transaction', None)
+        if transaction is not None and transaction.connection is connection:
+            # the transaction releases it on exit, unread rows
+            # are read out since the connection can't be replaced midway
+            if discard:
+                connection.consume_results()
+            return
+
+        try:
+            connection.msql_last_used = time.monotonic()
+        except:
+            pass
+
+        if self.pool is not None:
+            self.pool.put(connection, discard)
+            return
+
+        try:
+            if discard and connection is self.connection:
+                self._drop_connection()
+        finally:
+            self.lock.release()
+
+    @contextmanager
+    def _borrow(self):
+        '''
+            Lends a connection for the length of a call.
+            If the connection is lost during the call, it's dropped instead of being reused.
+        '''
+        connection = self._acquire()
+        discard = False
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            discard = True
+            raise
+        finally:
+            self._release(connection, discard)
+
+    def _read(self, sql_line: str, values=None, one: bool=False, with_columns: bool=False):
+        '''
+            Executes an idempotent query and returns its rows (or its first row if one is True,
+            and the column names as well if with_columns is True).
+            If the connection is lost, the query is retried on a new one up to read_retries times,
+            waiting retry_backoff seconds (doubled each time) in between.
+            Inside a transaction it isn't retried, since the transaction is lost with its connection.
+        '''
+        attempt = 0
+        while True:
+            try:
+                with self._borrow() as connection:
+                    cursor = connection.cursor(buffered=True)
+                    self._execute(cursor, sql_line, values)
+                    rows = cursor.fetchone() if one else cursor.fetchall()
+                    if with_columns:
+                        return(rows, list(cursor.column_names))
+                    return(rows)
+            except CONNECTION_ERRORS:
+                if attempt >= self.read_retries or getattr(self.local, 'transaction', None) is not None:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+                attempt += 1
+
+    def _write_cursor(self, connection, sql_line: str):
+        '''
+            Returns a cursor to execute the given write statement with.
+            With prepared=True, each connection keeps a prepared cursor per statement
+            (the least recently used is closed past prepared_cache_size), and since a
+            prepared cursor only re-prepares when its statement changes,
+            the server parses every statement once per connection.
+        '''
+        if not self.prepared:
+            return connection.cursor()
+
+        # the connection is borrowed by a single thread at a time,
+        # so its statements need no lock
+        statements = getattr(connection, 'msql_statements', None)
+        if statements is None:
+            statements = OrderedDict()
+            connection.msql_statements = statements
+
+        cursor = statements.get(sql_line)
+        if cursor is not None:
+            statements.move_to_end(sql_line)
+            return cursor
+
+        cursor = connection.cursor(prepared=True)
+        statements[sql_line] = cursor
+        if len(statements) > self.prepared_cache_size:
+            _, evicted = statements.popitem(last=False)
+            try:
+                # deallocates the statement on the server
+                evicted.close()
+            except:
+                pass
+        return cursor
+
+    def _stream(self, sql_line: str, values: tuple, batch_size: int, error: str, batches: bool=False):
+        '''
+            A generator executing a query on an unbuffered cursor,
+            fetching batch_size rows at a time and yielding them one by one
+            (or a batch at a time if batches is True).
+            The connection is held until the generator is exhausted or closed,
+            if it's closed early the unread rows are dropped with the connection
+            instead of being read to the end.
+            Without a pool (and outside a transaction) the stream opens a connection of its own,
+            closed when the generator is done, since the single connection can't be held
+            across yields - other calls would find its unread rows, and its lock would be
+            released by whichever thread finishes the generator.
+            An in-memory SQLite database can only be reached through the single connection,
+            so it's locked just while each batch is fetched (an SQLite cursor can be left midway).
+        '''
+        dedicated = self.pool is None and getattr(self.local, 'transaction', None) is None
+        if dedicated and self.backend == 'sqlite' and self.database_name == ':memory:':
+            yield from self._stream_shared(sql_line, values, batch_size, error, batches)
+            return
+
+        connection = self._connect() if dedicated else self._acquire()
+        try:
+            cursor = connection.cursor(buffered=False)
+            try:
+                self._execute(cursor, sql_line, values)
+            except:
+                raise Exception(error)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if batches:
+                    yield rows
+                else:
+                    yield from rows
+        finally:
+            if dedicated:
+                try:
+                    connection.close()
+                except:
+                    pass
+            else:
+                discard = getattr(connection, 'unread_result', True)
+                self._release(connection, discard)
+
+    def _stream_shared(self, sql_line: str, values: tuple, batch_size: int, error: str, batches: bool=False):
+        '''
+            Same as _stream, on the single connection of an in-memory SQLite database,
+            borrowing it for the query and for each batch instead of across yields.
+        '''
+        with self._borrow() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                self._execute(cursor, sql_line, values)
+            except:
+                raise Exception(error)
+
+        while True:
+            with self._borrow():
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if batches:
+                yield rows
+            else:
+                yield from rows
 
 
+    @instrumented
     def show_dbs(self):
         '''
             Returns a list of the databases in the server.
@@ -117,15 +1396,16 @@ class MSQL:
             an error will be returned (usually will happen due to disconnection.)
         '''
         try:
-            self.cursor.execute("SHOW DATABASES")
+            rows = self._read("SHOW DATABASES")
         except:
             return(f"ERROR: Either you disconnected, or there are no Databases")
         
         dbs =[]
-        for db in self.cursor:
+        for db in rows:
             dbs.append(db[0])
         return({"DBs": dbs})
 
+    @instrumented
     def show_tables(self):
         '''
             Returns a list of tables in your database.
@@ -137,18 +1417,23 @@ class MSQL:
         '''
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        elif self.cache_schema and self.database_name in self.table_lists:
+            return({"DB": self.database_name, "Tables": list(self.table_lists[self.database_name])})
         else:
             try:
                 sql_line = "SHOW TABLES"
-                self.cursor.execute(sql_line)
+                rows = self._read(sql_line)
             except:
                 return(f"ERROR: Either you disconnected, or there are no tables in db: {self.database_name}")
 
             tables = []
-            for table in self.cursor:
+            for table in rows:
                 tables.append(table[0])
+            if self.cache_schema:
+                self.table_lists[self.database_name] = list(tables)
             return({"DB": self.database_name, "Tables":tables})
 
+    @instrumented
     def show_columns(self, table_name: str):
         '''
             Returns a dict with the columns and the type of values they expect.
@@ -165,19 +1450,120 @@ class MSQL:
         '''
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        elif self.cache_schema:
+            schema = self.get_schema(table_name)
+            if type(schema) == str:
+                return(schema)
+            return({"DB": self.database_name, "Table": table_name, "Columns": dict(schema["Columns"])})
         else:
             try:
                 sql_line = f"SHOW Columns in {table_name}"
-                self.cursor.execute(sql_line)
+                rows = self._read(sql_line)
             except:
                 return(f"ERROR: Either you disconnected, or table: {table_name} doesn't exist")
             
             columns = {}
-            for column in self.cursor:
+            for column in rows:
                 columns[column[0]] = column[1]
             return({"DB": self.database_name, "Table": table_name, "Columns": columns})
 
+    @instrumented
+    def get_schema(self, table_name: str, refresh: bool=False):
+        '''
+            Returns the schema of a table - its columns and their types, the columns
+            that may be NULL, the primary key and a coercer per column (see column_coercer).
+            It's loaded from the server once per database and table, and then cached.
+
+            Example of use:
+            get_schema('test_table')
+            => {"DB": 'test_db', "Table": 'test_table', "Columns": {'id': 'int', 'name': 'varchar(255)'},
+                "Nullable": ['name'], "PrimaryKey": ['id']}
+
+            Parameters
+            ----------
+            table_name: str
+                A table to describe.
+            refresh: bool (optional)
+                Reload the schema from the server even if it's cached.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no db is specified in self.database_name, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+
+        database_name = self.database_name
+        if not refresh:
+            schema = self.schemas.get(database_name, {}).get(table_name)
+            if schema is not None:
+                return(schema)
+
+        try:
+            rows = self._read(f"SHOW Columns in {table_name}")
+        except:
+            return(f"ERROR: Either you disconnected, or table: {table_name} doesn't exist")
+
+        columns, nullable, primary_key, coercers = {}, [], [], {}
+        for row in rows:
+            # Field, Type, Null, Key, Default, Extra
+            name, column_type, null, key, _, extra = [value.decode('utf-8') if isinstance(value, (bytes, bytearray)) else value for value in row[:6]]
+            columns[name] = column_type
+            # an auto increment column is filled by the server when NULL is sent
+            may_be_null = null == 'YES' or 'auto_increment' in (extra or '')
+            if may_be_null:
+                nullable.append(name)
+            if key == 'PRI':
+                primary_key.append(name)
+            coercers[name] = MSQL.column_coercer(name, column_type, may_be_null)
+
+        schema = {"DB": database_name, "Table": table_name, "Columns": columns,
+                  "Nullable": nullable, "PrimaryKey": primary_key, "Coercers": coercers}
+        with self.schema_lock:
+            self.schemas.setdefault(database_name, {})[table_name] = schema
+        return(schema)
+
+    def refresh_schema(self, table_name: str=None):
+        '''
+            Drops the cached schema of a table (or of every table and the table list
+            if no table is given), they're loaded again on next use.
+        '''
+        with self.schema_lock:
+            if table_name is None:
+                self.schemas.pop(self.database_name, None)
+            else:
+                self.schemas.get(self.database_name, {}).pop(table_name, None)
+            self.table_lists.pop(self.database_name, None)
+
+    def _coercers(self, table_name: str, columns: tuple):
+        '''
+            Returns the coercers of the columns given (in their order),
+            or an error if the table doesn't have one of them.
+        '''
+        schema = self.get_schema(table_name)
+        if type(schema) == str:
+            return(schema)
+
+        unknown = [column for column in columns if column not in schema["Columns"]]
+        if unknown:
+            return(f"ERROR: table {table_name} has no column(s) named {', '.join(map(str, unknown))}, its columns are: {', '.join(schema['Columns'])}")
+        return([schema["Coercers"][column] for column in columns])
+
+    def _check_values(self, table_name: str, columns: tuple, values: tuple):
+        '''
+            Validates and coerces a row of values against the cached schema,
+            returns the coerced values or an error (without asking the server).
+        '''
+        coercers = self._coercers(table_name, columns)
+        if type(coercers) == str:
+            return(coercers)
+        try:
+            return(MSQL.coerce_row(coercers, values))
+        except ValueError as error:
+            return(f"ERROR: {error}")
 
+    @instrumented
     def create_db(self, db_name: str):
         '''
             Creates a DB with the name given.
@@ -192,94 +1578,407 @@ class MSQL:
             ------
             If a connection can't be established, an error will be returned.
         '''
-        sql_line = f"CREATE DATABASE {db_name}"
+        sql_line = f"CREATE DATABASE {db_name}"
+        try:
+            with self._borrow() as connection:
+                self._execute(connection.cursor(), sql_line)
+            self.database_name = db_name
+            self.reconnect()
+            return({'DB': self.database_name})
+        except:
+            return(f"ERROR: Either you disconnected, or a DB named {db_name} already exists")
+
+    @instrumented
+    def create_table(self, table_name: str, columns: str):
+        '''
+            Creates a table with the name and columns given,
+            Example of use:
+            MSQL_object.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to create.
+            columns: str
+                contains the columns to create, and the types they expect.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        else:
+            try:
+                sql_line = f"CREATE TABLE {table_name} {columns}"
+                with self._borrow() as connection:
+                    self._execute(connection.cursor(), sql_line)
+                self.refresh_schema(table_name)
+                return ({"DB": self.database_name, "Table": table_name})
+            except:
+                return(f"ERROR: Either you disconnected, or a table named {table_name} already exists, or the columns were given in an incorrect format.\nExample of use:\nMSQL_object.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')")
+
+    @instrumented
+    def drop_table(self, table_name: str, if_exists: bool=True):
+        '''
+            Drops the table given (if it exists, unless if_exists is False).
+            Example of use:
+            MSQL_object.drop_table('test_table')
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to drop.
+            if_exists: bool (optional)
+                Don't fail if there's no such table.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            sql_line = f"DROP TABLE {'IF EXISTS ' if if_exists else ''}{table_name}"
+            with self._borrow() as connection:
+                self._execute(connection.cursor(), sql_line)
+            self.refresh_schema(table_name)
+            self._invalidate(table_name)
+            return ({"DB": self.database_name, "Table": table_name})
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist.\nExample of use:\nMSQL_object.drop_table('test_table')")
+
+
+    @instrumented
+    def insert_record(self, table_name: str, columns: tuple, values: tuple):
+        '''
+            Inserts a record to table given, fills the supplied columns with the supplied values.
+            Reformats the strings with help of the static methods.
+            Return its ID.
+            Example of use:
+            insert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem')) 
+
+            OR 
+            insert_record('test_table', ('name',), ('gabi',))
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to insert to.
+            columns: tuple
+                Contains the columns to fill.
+            values: tuple
+                Contains the values to in correlation to the values.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+            If the columns parameters ins't set correctly, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        else:    
+            try:
+                sql_line = MSQL.statement('insert', table_name, tuple(columns))
+            except:
+                return("ERROR: couldnt format the columns argument, it should look like so:\ninsert_record(columns=('age', 'name'))\nOR\ninsert_record(columns=('age',))")
+
+            if self.cache_schema:
+                values = self._check_values(table_name, tuple(columns), values)
+                if type(values) == str:
+                    return(values)
+
+            try:
+                with self._borrow() as connection:
+                    cursor = self._write_cursor(connection, sql_line)
+                    self._execute(cursor, sql_line, values)
+                    self._commit(connection)
+                    return {"id": str(cursor.lastrowid)}
+            except:
+                return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\ninsert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem'))\nOR\ninsert_record('test_table', ('name',), ('gabi',))")
+
+    @instrumented
+    def insert_records(self, table_name: str, columns: tuple, rows, chunk_size: int=1000):
+        '''
+            Inserts many records to the table given, filling the supplied columns.
+            The rows are read lazily (a generator works) and sent in chunks,
+            each chunk is a single multi-row INSERT ... VALUES (...),(...) statement
+            followed by a single commit.
+            Returns the amount of records inserted, the amount of chunks,
+            and the first/last generated IDs.
+            Example of use:
+            insert_records('test_table', ('name', 'age'), [('bob', 22), ('john', 31)])
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to insert to.
+            columns: tuple
+                Contains the columns to fill.
+            rows: iterable
+                Tuples of values, each in correlation to the columns.
+            chunk_size: int (optional)
+                Maximum records sent (and committed) in one statement,
+                lowered so a statement holds at most MAX_PLACEHOLDERS values.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+            If a chunk fails, an error will be returned, chunks sent before it stay committed.
+            
+            Notes
+            -----
+            The last ID assumes the IDs of a multi-row insert are consecutive,
+            which is the case for InnoDB auto increment columns.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if chunk_size < 1:
+            return("ERROR: chunk_size should be a positive integer")
+
         try:
-            self.cursor.execute(sql_line)
-            self.database_name = db_name
-            self.reconnect()
-            return({'DB': self.database_name})
+            columns = tuple(columns)
+            MSQL.statement('insert', table_name, columns)
         except:
-            return(f"ERROR: Either you disconnected, or a DB named {db_name} already exists")
+            return("ERROR: couldnt format the columns argument, it should look like so:\ninsert_records(columns=('age', 'name'))\nOR\ninsert_records(columns=('age',))")
+        chunk_size = min(chunk_size, max(MAX_PLACEHOLDERS // max(len(columns), 1), 1))
 
-    def create_table(self, table_name: str, columns: str):
+        coercers = None
+        if self.cache_schema:
+            coercers = self._coercers(table_name, columns)
+            if type(coercers) == str:
+                return(coercers)
+
+        rows = iter(rows)
+        inserted, chunks, first_id, last_id = 0, 0, None, None
+        try:
+            with self._borrow() as connection:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+
+                    values = []
+                    for row in chunk:
+                        if len(row) != len(columns):
+                            raise ValueError(f"row {row} doesn't match the columns {columns}")
+                        if coercers is not None:
+                            row = MSQL.coerce_row(coercers, row)
+                        values.extend(row)
+
+                    # full chunks share one statement, only the last one differs
+                    sql_line = MSQL.statement('insert', table_name, columns, len(chunk))
+                    cursor = self._write_cursor(connection, sql_line)
+                    self._execute(cursor, sql_line, values)
+                    self._commit(connection)
+
+                    inserted += len(chunk)
+                    chunks += 1
+                    # a multi-row insert reports the ID of its first record
+                    if cursor.lastrowid:
+                        if first_id is None:
+                            first_id = str(cursor.lastrowid)
+                        last_id = str(cursor.lastrowid + len(chunk) - 1)
+        except ValueError as error:
+            return(f"ERROR: {error}\n{inserted} records were inserted before the failure.")
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table.\n{inserted} records were inserted before the failure.\nExample of use:\ninsert_records('test_table', ('name', 'age'), [('bob', 22), ('john', 31)])")
+
+        return({"inserted": inserted, "chunks": chunks, "first_id": first_id, "last_id": last_id})
+
+    @instrumented
+    def upsert_records(self, table_name: str, columns: tuple, rows, update_columns: tuple=None, chunk_size: int=1000):
         '''
-            Creates a table with the name and columns given,
+            Inserts many records to the table given, and records whose primary/unique key
+            already exists are updated instead ("update if exists, else insert").
+            The rows are read lazily (a generator works) and sent in chunks,
+            each chunk is a single multi-row INSERT ... ON DUPLICATE KEY UPDATE statement
+            followed by a single commit.
+            Returns the amount of records sent, affected, inserted and updated.
             Example of use:
-            MSQL_object.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')
+            upsert_records('test_table', ('id', 'name', 'age'), [(1, 'bob', 23), (2, 'john', 31)])
 
             Parameters 
             ----------
             table_name: str
-                A table to create.
-            columns: str
-                contains the columns to create, and the types they expect.
+                A table to upsert to.
+            columns: tuple
+                Contains the columns to fill, should include the key.
+            rows: iterable
+                Tuples of values, each in correlation to the columns.
+            update_columns: tuple (optional)
+                Columns to update when the record exists, defaults to all the columns but id.
+            chunk_size: int (optional)
+                Maximum records sent (and committed) in one statement,
+                lowered so a statement holds at most MAX_PLACEHOLDERS values.
 
             Raises
             ------
             If a connection can't be established, an error will be returned.
             If no DB is specified, an error will be returned.
+            If a chunk fails, an error will be returned, chunks sent before it stay committed.
+
+            Notes
+            -----
+            MySQL counts 1 affected row per insert, 2 per update and 0 per record
+            updated to the values it already had, the inserted/updated amounts are
+            derived from these assuming every existing record actually changed.
+            SQLite counts 1 affected row either way, so there all of them are counted as inserted.
         '''
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
-        else:
-            try:
-                sql_line = f"CREATE TABLE {table_name} {columns}"
-                self.cursor.execute(sql_line)
-                return ({"DB": self.database_name, "Table": table_name})
-            except:
-                return(f"ERROR: Either you disconnected, or a table named {table_name} already exists, or the columns were given in an incorrect format.\nExample of use:\nMSQL_object.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')")
+        if chunk_size < 1:
+            return("ERROR: chunk_size should be a positive integer")
 
+        try:
+            columns = tuple(columns)
+            if update_columns is None:
+                update_columns = tuple(column for column in columns if column != 'id')
+            update_columns = tuple(update_columns)
+            MSQL.statement('upsert', table_name, columns, 1, update_columns)
+        except:
+            return("ERROR: couldnt format the columns arguments, it should look like so:\nupsert_records(columns=('id', 'name'), update_columns=('name',))")
+        chunk_size = min(chunk_size, max(MAX_PLACEHOLDERS // max(len(columns), 1), 1))
 
-    def insert_record(self, table_name: str, columns: tuple, values: tuple):
+        coercers = None
+        if self.cache_schema:
+            coercers = self._coercers(table_name, columns)
+            if type(coercers) == str:
+                return(coercers)
+
+        rows = iter(rows)
+        sent, affected, inserted, updated = 0, 0, 0, 0
+        try:
+            with self._borrow() as connection:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+
+                    values = []
+                    for row in chunk:
+                        if len(row) != len(columns):
+                            raise ValueError(f"row {row} doesn't match the columns {columns}")
+                        if coercers is not None:
+                            row = MSQL.coerce_row(coercers, row)
+                        values.extend(row)
+
+                    sql_line = MSQL.statement('upsert', table_name, columns, len(chunk), update_columns)
+                    cursor = self._write_cursor(connection, sql_line)
+                    self._execute(cursor, sql_line, values)
+                    self._commit(connection)
+
+                    sent += len(chunk)
+                    affected += cursor.rowcount
+                    chunk_updated = min(max(cursor.rowcount - len(chunk), 0), len(chunk))
+                    updated += chunk_updated
+                    inserted += len(chunk) - chunk_updated
+        except ValueError as error:
+            return(f"ERROR: {error}\n{sent} records were upserted before the failure.")
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table.\n{sent} records were upserted before the failure.\nExample of use:\nupsert_records('test_table', ('id', 'name', 'age'), [(1, 'bob', 23), (2, 'john', 31)])")
+        finally:
+            # the updated records aren't known by ID
+            self._invalidate(table_name)
+
+        return({"records": sent, "affected": affected, "inserted": inserted, "updated": updated})
+
+    @instrumented
+    def bulk_load(self, table_name: str, columns: tuple, source, chunk_size: int=10000):
         '''
-            Inserts a record to table given, fills the supplied columns with the supplied values.
-            Reformats the strings with help of the static methods.
-            Return its ID.
-            Example of use:
-            insert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem')) 
+            Loads many records to the table given with MySQL's native bulk path,
+            LOAD DATA LOCAL INFILE.
+            The source is either an iterable of value tuples (a generator works), which is
+            streamed into a temporary tab delimited file first, or a path of such a file
+            (fields separated by tabs, records by newlines, NULL as \\N and backslash,
+            tab, newline, carriage return and NUL escaped by a backslash, as MySQL expects).
+            If the server (or the connection) doesn't allow loading local files,
+            the records are inserted with insert_records instead.
+            Returns the amount of records loaded, the warnings the server raised,
+            the seconds it took and the method used.
 
-            OR 
-            insert_record('test_table', ('name',), ('gabi',))
+            Example of use:
+            db = MSQL('localhost', 'root', '123456', 'test_db', allow_local_infile=True)
+            db.bulk_load('test_table', ('name', 'age'), ((f'user{i}', i) for i in range(1000000)))
 
             Parameters 
             ----------
             table_name: str
-                A table to insert to.
+                A table to load to.
             columns: tuple
                 Contains the columns to fill.
-            values: tuple
-                Contains the values to in correlation to the values.
+            source: iterable/str
+                Tuples of values, each in correlation to the columns, or a file path.
+            chunk_size: int (optional)
+                Records per statement, if falling back to insert_records.
 
             Raises
             ------
             If a connection can't be established, an error will be returned.
             If no DB is specified, an error will be returned.
-            If the columns parameters ins't set correctly, an error will be returned.
+            If the source file doesn't exist, an error will be returned.
+
+            Notes
+            -----
+            Local files must also be allowed by the object (allow_local_infile=True)
+            and by the server (local_infile=ON), otherwise the fallback is used.
         '''
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
-        else:    
-            try:
-                column_string = MSQL.tpl_to_str_brckts(columns)
-                if len(columns) == 1: 
-                    column_string = column_string.replace(",","")
-            except:
-                return("ERROR: couldnt format the columns argument, it should look like so:\ninsert_record(columns=('age', 'name'))\nOR\ninsert_record(columns=('age',))")
-            
-            param_list = []
-            for _ in range(len(columns)):
-                param_list.append(r"%s")
 
-            param_string = MSQL.lst_to_str_brckts(param_list)
+        started = time.monotonic()
+        columns = tuple(columns)
+        created_file = not isinstance(source, str)
+        file_path = source
+        try:
+            if created_file:
+                with tempfile.NamedTemporaryFile('wb', suffix='.tsv', delete=False) as load_file:
+                    file_path = load_file.name
+                    for row in source:
+                        if len(row) != len(columns):
+                            raise ValueError(f"row {row} doesn't match the columns {columns}")
+                        load_file.write(b'\t'.join(MSQL.escape_field(value) for value in row) + b'\n')
+            elif not os.path.isfile(file_path):
+                return(f"ERROR: No such file as {file_path} found")
 
-            try:
-                sql_line = f"INSERT INTO {table_name} {column_string} VALUES {param_string}"
-                self.cursor.execute(sql_line, values)
-                self.connection.commit()
-                return {"id": str(self.cursor.lastrowid)}
-            except:
-                return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\ninsert_record('test_table', ('name', 'address'), ('ezra', 'jerusalem'))\nOR\ninsert_record('test_table', ('name',), ('gabi',))")
+            if self.allow_local_infile and self.backend == 'mysql':
+                sql_line = (f"LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} CHARACTER SET utf8mb4 "
+                            r"FIELDS TERMINATED BY '\t' ESCAPED BY '\\' LINES TERMINATED BY '\n' "
+                            f"({', '.join(columns)})")
+                try:
+                    with self._borrow() as connection:
+                        cursor = connection.cursor()
+                        self._execute(cursor, sql_line, (file_path,))
+                        self._commit(connection)
+                        loaded, warnings = cursor.rowcount, getattr(cursor, 'warning_count', 0) or 0
+                    return({"rows": loaded, "warnings": warnings, "seconds": time.monotonic() - started,
+                            "method": "load_data"})
+                except connector.Error as error:
+                    # loading local files is disabled on the server/client
+                    if getattr(error, 'errno', None) not in (1148, 2068, 3948):
+                        raise
+
+            result = self.insert_records(table_name, columns, MSQL.read_delimited(file_path), chunk_size)
+            if type(result) == str:
+                return(result)
+            return({"rows": result["inserted"], "warnings": 0, "seconds": time.monotonic() - started,
+                    "method": "insert"})
+        except ValueError as error:
+            return(f"ERROR: {error}")
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\nbulk_load('test_table', ('name', 'age'), [('bob', 22), ('john', 31)])")
+        finally:
+            if created_file and file_path is not None:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
 
+    @instrumented
     def delete_record(self, table_name: str, record_id: str):
         '''
             Deletes a record from table given, according to the ID sent.
@@ -304,15 +2003,79 @@ class MSQL:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
         else:
             try:
-                sql_line = f"delete from {table_name} where id=%s"
+                sql_line = MSQL.statement('delete', table_name)
                 value = (record_id,)
 
-                self.cursor.execute(sql_line, value)
-                self.connection.commit()
+                with self._borrow() as connection:
+                    self._execute(self._write_cursor(connection, sql_line), sql_line, value)
+                    self._commit(connection)
+                self._invalidate(table_name, record_id)
                 return({"id": record_id})
             except:
                 return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\ndelete_record('test_table', 12345)")
 
+    @instrumented
+    def delete_records(self, table_name: str, record_ids, chunk_size: int=1000):
+        '''
+            Deletes the records with the IDs given from table given.
+            Duplicate IDs are dropped, and the rest are deleted with
+            chunked "where id in (...)" statements inside a single transaction,
+            so either all of them are deleted or none.
+            Returns the amount of records deleted.
+            Called inside a transaction()/batch() the chunks join it instead, so that guarantee
+            is the outer block's - a failed chunk raises (rather than returning an error)
+            for the block to roll back, and inside a batch the chunks group committed
+            before the failure stay deleted.
+
+            Example of use:
+            delete_records('test_table', ['12', '13', '20'])
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to delete from.
+            record_ids: iterable
+                The IDs of the records to delete.
+            chunk_size: int (optional)
+                Maximum IDs in one statement (at most MAX_PLACEHOLDERS).
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+            If a chunk fails, the transaction is rolled back and an error will be returned
+            (or the exception is raised, inside an outer transaction/batch).
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if chunk_size < 1:
+            return("ERROR: chunk_size should be a positive integer")
+
+        record_ids = MSQL.unique_ids(record_ids)
+        chunk_size = min(chunk_size, MAX_PLACEHOLDERS)
+        deleted = 0
+        outer = getattr(self.local, 'transaction', None) is not None
+        try:
+            with self.transaction():
+                with self._borrow() as connection:
+                    for start in range(0, len(record_ids), chunk_size):
+                        chunk = record_ids[start:start + chunk_size]
+                        sql_line = MSQL.statement('delete_in', table_name, rows=len(chunk))
+                        cursor = self._write_cursor(connection, sql_line)
+                        self._execute(cursor, sql_line, chunk)
+                        deleted += cursor.rowcount
+                        self._commit(connection)
+                for record_id in record_ids:
+                    self._invalidate(table_name, record_id)
+        except:
+            if outer:
+                # the chunks deleted so far are only undone by the outer transaction's rollback
+                raise
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, nothing was deleted\nExample of use:\ndelete_records('test_table', ['12', '13', '20'])")
+
+        return({"deleted": deleted, "ids": record_ids})
+
+    @instrumented
     def find_record(self, table_name: str, record_id: str):
         '''
             Finds and returns a record from table given, according to the ID sent.
@@ -335,17 +2098,96 @@ class MSQL:
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
         else:
+            # records read inside a transaction might not be committed,
+            # so transactions bypass the cache
+            cache = self.record_cache
+            if cache is not None and (not cache.caches(table_name) or getattr(self.local, 'transaction', None) is not None):
+                cache = None
+            if cache is not None:
+                cached = cache.get(table_name, str(record_id))
+                if cached is not None:
+                    return(list(cached))
+                generation = cache.generation(table_name)
+
             try:
-                sql_line = f"select * from {table_name} where id=%s"
+                sql_line = MSQL.statement('select', table_name)
                 value = (record_id,)
 
-                self.cursor.execute(sql_line, value)
-                result = self.cursor.fetchone()
-                return(list(result))
+                result = list(self._read(sql_line, value, one=True))
+                if cache is not None:
+                    cache.put(table_name, str(record_id), tuple(result), generation)
+                return(result)
             except:
                 return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\nfind_record('test_table', 12345)")
 
-    def find_records(self, table_name: str, column: str, value: str):
+    @instrumented
+    def find_records_by_ids(self, table_name: str, record_ids, chunk_size: int=1000):
+        '''
+            Finds and returns the records with the IDs given, from table given.
+            Duplicate IDs are dropped, and the rest are looked up with
+            chunked "where id in (...)" queries instead of one query per ID.
+            Returns the records keyed by the IDs as given, and a list of the IDs not found.
+            When the record cache is enabled, cached records are served from it.
+
+            Example of use:
+            find_records_by_ids('test_table', ['12', '13', '20'])
+            => {"records": {"12": [12, 'bob', ...], "13": [13, 'john', ...]}, "missing": ["20"]}
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to get records from.
+            record_ids: iterable
+                The IDs of the records to find.
+            chunk_size: int (optional)
+                Maximum IDs in one query.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if chunk_size < 1:
+            return("ERROR: chunk_size should be a positive integer")
+
+        # the server might return the IDs in another type than given (12 for '12'),
+        # so they're matched by their string
+        requested = {str(record_id): record_id for record_id in MSQL.unique_ids(record_ids)}
+        records = {}
+
+        cache = self.record_cache
+        if cache is not None and (not cache.caches(table_name) or getattr(self.local, 'transaction', None) is not None):
+            cache = None
+        if cache is not None:
+            generation = cache.generation(table_name)
+            for key, record_id in requested.items():
+                cached = cache.get(table_name, key)
+                if cached is not None:
+                    records[record_id] = list(cached)
+
+        to_find = [record_id for record_id in requested.values() if record_id not in records]
+        try:
+            for start in range(0, len(to_find), chunk_size):
+                chunk = to_find[start:start + chunk_size]
+                rows, column_names = self._read(MSQL.statement('select_in', table_name, rows=len(chunk)), chunk,
+                                                with_columns=True)
+                id_index = column_names.index('id')
+                for row in rows:
+                    key = str(row[id_index])
+                    if key in requested:
+                        records[requested[key]] = list(row)
+                        if cache is not None:
+                            cache.put(table_name, key, tuple(row), generation)
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\nfind_records_by_ids('test_table', ['12', '13', '20'])")
+
+        missing = [record_id for record_id in requested.values() if record_id not in records]
+        return({"records": records, "missing": missing})
+
+    @instrumented
+    def find_records(self, table_name: str, column: str, value: str, as_columns: bool=False):
         '''
             Finds and returns a record(s) from table given, according to the columns/values given.
 
@@ -360,27 +2202,36 @@ class MSQL:
                 A column to query by.
             value: str
                 The value the column should be, to query by,
+            as_columns: bool (optional)
+                Return the records by column instead, see fetch_columnar.
 
             Raises
             ------
             If a connection can't be established, an error will be returned.
             If no DB is specified, an error will be returned.
         '''
+        if as_columns:
+            return(self.fetch_columnar(table_name, column, value))
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
         else:
+            if self.cache_schema:
+                value = self._check_values(table_name, (column,), (value,))
+                if type(value) == str:
+                    return(value)
+                value = value[0]
+
             try:
                 sql_line = f"select * from {table_name} where {column}=%s"
                 value = (value,)
 
-                self.cursor.execute(sql_line, value)
-
-                result = self.cursor.fetchall()
+                result = self._read(sql_line, value)
                 return(result)
             except:
                 return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the columns given don't exist\nExample of use:\nfind_records('test_table', 'name', 'john')")
 
-    def find_all_records(self, table_name: str):
+    @instrumented
+    def find_all_records(self, table_name: str, as_columns: bool=False):
         '''
             Finds and returns a record(s) from table given, according to the columns/values given.
 
@@ -395,25 +2246,282 @@ class MSQL:
                 A column to query by.
             value: str
                 The value the column should be, to query by,
+            as_columns: bool (optional)
+                Return the records by column instead, see fetch_columnar.
 
             Raises
             ------
             If a connection can't be established, an error will be returned.
             If no DB is specified, an error will be returned.
         '''
+        if as_columns:
+            return(self.fetch_columnar(table_name))
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
         else:
             try:
                 sql_line = f"select * from {table_name}"
 
-                self.cursor.execute(sql_line)
-
-                result = self.cursor.fetchall()
+                result = self._read(sql_line)
                 return(result)
             except:
                 return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the columns given don't exist\nExample of use:\nfind_records('test_table', 'name', 'john')")
 
+    @instrumented
+    def fetch_columnar(self, table_name: str, column: str=None, value=None, batch_size: int=10000, use_numpy: bool=False):
+        '''
+            Finds the records of the table given (all of them, or those where column=value),
+            and returns them by column instead of by record.
+            The records are streamed batch_size at a time and added straight into a buffer per column,
+            typed by the table's schema - array('q') for integers, array('d') for floats and doubles,
+            and a list for anything else (or for a numeric column holding NULLs).
+            So no tuple per record is kept, and the columns are ready for vectorized use.
+
+            Example of use:
+            fetch_columnar('test_table', 'name', 'bob')
+            => {"DB": 'test_db', "Table": 'test_table', "Rows": 2,
+                "Columns": {'id': array('q', [1, 2]), 'name': ['bob', 'bob'], 'age': array('q', [22, 56])}}
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to query.
+            column: str (optional)
+                A column to query by.
+            value: (optional)
+                The value the column should be, to query by.
+            batch_size: int (optional)
+                Amount of records fetched from the server at a time.
+            use_numpy: bool (optional)
+                Return NumPy arrays instead (object arrays for the list columns),
+                needs numpy to be installed.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+            If use_numpy is set but numpy isn't installed, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if use_numpy and numpy is None:
+            return("ERROR: numpy isn't installed, install it or use use_numpy=False")
+
+        schema = self.get_schema(table_name)
+        if type(schema) == str:
+            return(schema)
+
+        if column is None:
+            sql_line, values = f"select * from {table_name}", None
+        else:
+            if self.cache_schema:
+                checked = self._check_values(table_name, (column,), (value,))
+                if type(checked) == str:
+                    return(checked)
+                value = checked[0]
+            sql_line, values = f"select * from {table_name} where {column}=%s", (value,)
+
+        names = list(schema["Columns"])
+        buffers = [MSQL.column_buffer(schema["Columns"][name]) for name in names]
+        error = f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the columns given don't exist\nExample of use:\nfetch_columnar('test_table', 'name', 'john')"
+        count = 0
+        try:
+            for rows in self._stream(sql_line, values, batch_size, error, batches=True):
+                count += len(rows)
+                for index, values_of_column in enumerate(zip(*rows)):
+                    buffer = buffers[index]
+                    length = len(buffer)
+                    try:
+                        buffer.extend(values_of_column)
+                    except TypeError:
+                        # a NULL (or an unexpected type) in a typed column, it falls back to a list
+                        del buffer[length:]
+                        buffers[index] = buffer.tolist()
+                        buffers[index].extend(values_of_column)
+        except Exception as stream_error:
+            return(str(stream_error))
+
+        if use_numpy:
+            buffers = [numpy.frombuffer(buffer, dtype=buffer.typecode) if isinstance(buffer, array)
+                       else numpy.array(buffer, dtype=object) for buffer in buffers]
+        return({"DB": self.database_name, "Table": table_name, "Rows": count,
+                "Columns": dict(zip(names, buffers))})
+
+    def iter_records(self, table_name: str, column: str, value: str, batch_size: int=1000):
+        '''
+            Same as find_records, but returns a generator instead of a list.
+            The records are streamed from the server batch_size at a time,
+            so memory stays flat no matter how many records match.
+
+            Example of use:
+            for record in iter_records('test_table', 'name', 'john'):
+                print(record)
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to query.
+            column: str
+                A column to query by.
+            value: str
+                The value the column should be, to query by,
+            batch_size: int (optional)
+                Amount of records fetched from the server at a time.
+
+            Raises
+            ------
+            If no DB is specified, an error will be returned (instead of a generator).
+            If the query fails, an exception will be raised upon iterating.
+
+            Notes
+            -----
+            The generator holds a connection until it is exhausted or closed,
+            without a pool it opens a connection of its own (see _stream),
+            so other calls on the object aren't blocked by it.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if self.cache_schema:
+            value = self._check_values(table_name, (column,), (value,))
+            if type(value) == str:
+                return(value)
+            value = value[0]
+        sql_line = f"select * from {table_name} where {column}=%s"
+        error = f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the columns given don't exist\nExample of use:\niter_records('test_table', 'name', 'john')"
+        return self._stream(sql_line, (value,), batch_size, error)
+
+    def iter_all_records(self, table_name: str, batch_size: int=1000):
+        '''
+            Same as find_all_records, but returns a generator instead of a list.
+            The records are streamed from the server batch_size at a time,
+            so memory stays flat no matter the size of the table.
+
+            Example of use:
+            for record in iter_all_records('test_table', batch_size=5000):
+                print(record)
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to query.
+            batch_size: int (optional)
+                Amount of records fetched from the server at a time.
+
+            Raises
+            ------
+            If no DB is specified, an error will be returned (instead of a generator).
+            If the query fails, an exception will be raised upon iterating.
+
+            Notes
+            -----
+            The generator holds a connection until it is exhausted or closed,
+            without a pool it opens a connection of its own (see _stream),
+            so other calls on the object aren't blocked by it.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        sql_line = f"select * from {table_name}"
+        error = f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist\nExample of use:\niter_all_records('test_table')"
+        return self._stream(sql_line, None, batch_size, error)
+
+    @instrumented
+    def key_range(self, table_name: str, key: str='id'):
+        '''
+            Returns the minimum and maximum of a column of the table given
+            (both None if the table is empty), ie to split a scan of it to ranges.
+
+            Example of use:
+            key_range('test_table', 'id')
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to query.
+            key: str (optional)
+                The column to get the range of.
+
+            Raises
+            ------
+            If a connection can't be established, an error will be returned.
+            If no DB is specified, an error will be returned.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        try:
+            low, high = self._read(f"select min({key}), max({key}) from {table_name}", one=True)
+        except:
+            return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or it has no column named {key}")
+        return({"min": low, "max": high})
+
+    def scan(self, table_name: str, key: str='id', page_size: int=1000, start_after=None, where: str=None, params: tuple=()):
+        '''
+            Returns a generator going over the table page by page, ordered by key.
+            Every page is its own "where key > last ORDER BY key LIMIT page_size" query
+            (keyset pagination), so each page costs the same no matter how deep the scan is,
+            and no connection is held between pages.
+            Each page is a dict of its records and a cursor - the key of its last record,
+            passing it as start_after resumes the scan right after that page.
+
+            Example of use:
+            for page in db.scan('test_table', page_size=5000):
+                export(page["rows"])
+                save_progress(page["cursor"])
+
+            OR (resuming)
+            db.scan('test_table', start_after=load_progress(), where='age > %s', params=(18,))
+
+            Parameters 
+            ----------
+            table_name: str
+                A table to scan.
+            key: str (optional)
+                A unique (usually primary key) column to order and paginate by.
+            page_size: int (optional)
+                Amount of records in a page.
+            start_after: (optional)
+                A cursor of a previous page, the scan starts after it.
+            where: str (optional)
+                An extra condition records should match, with %s placeholders.
+            params: tuple (optional)
+                Values of the where placeholders.
+
+            Raises
+            ------
+            If no DB is specified, an error will be returned (instead of a generator).
+            If a page's query fails, an exception will be raised upon iterating.
+        '''
+        if self.database_name == None:
+            return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
+        if page_size < 1:
+            return("ERROR: page_size should be a positive integer")
+        return self._scan(table_name, key, page_size, start_after, where, tuple(params))
+
+    def _scan(self, table_name: str, key: str, page_size: int, start_after, where: str, params: tuple):
+        condition = f" and ({where})" if where else ""
+        first_page = f"select * from {table_name} where 1=1{condition} order by {key} limit {page_size}"
+        next_page = f"select * from {table_name} where {key} > %s{condition} order by {key} limit {page_size}"
+
+        cursor_value = start_after
+        while True:
+            if cursor_value is None:
+                sql_line, values = first_page, params
+            else:
+                sql_line, values = next_page, (cursor_value,) + params
+
+            try:
+                rows, column_names = self._read(sql_line, values, with_columns=True)
+                key_index = column_names.index(key)
+            except:
+                raise Exception(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the key/where given don't match it\nExample of use:\nscan('test_table', key='id', page_size=1000)")
+
+            if not rows:
+                return
+            cursor_value = rows[-1][key_index]
+            yield {"rows": rows, "cursor": cursor_value}
+            if len(rows) < page_size:
+                return
+
+    @instrumented
     def update_record(self, table_name: str, columns: tuple, values: tuple, record_id: str):
         '''
             Update a record from table given, according to the columns/values given.
@@ -446,13 +2554,19 @@ class MSQL:
         if self.database_name == None:
             return("ERROR: No Database Defined, either add it upon initializing the object,\nOr by self.database_name='example' \nAnd apply it by executing reconnect()")
         else:
+            if self.cache_schema:
+                values = self._check_values(table_name, tuple(columns), values)
+                if type(values) == str:
+                    return(values)
+
             try:
-                values_altered = MSQL.update_record_syntax_help(columns)
-                sql_line = f'update {table_name} set ' + values_altered + r' where id = %s'
-                values = values + (record_id,)
+                sql_line = MSQL.statement('update', table_name, tuple(columns))
+                values = tuple(values) + (record_id,)
 
-                self.cursor.execute(sql_line, values)
-                self.connection.commit()
+                with self._borrow() as connection:
+                    self._execute(self._write_cursor(connection, sql_line), sql_line, values)
+                    self._commit(connection)
+                self._invalidate(table_name, record_id)
                 return({"id": record_id})
             except:
                 return(f"ERROR: Either you disconnected, or a table named {table_name} doesn't exist, or the values/parameters don't match the table\nExample of use:\nupdate_record('test_table',('name', 'address'), ('bob', 'new york'),'12345')\nOR\ninsert_record('test_table', ('name',), ('gabi',), '1234')")
@@ -491,4 +2605,165 @@ class MSQL:
         for x in range(len(columns)):
             column_n_value_syntax = column_n_value_syntax + str(columns[x]) + r'= %s,'
         column_n_value_syntax=column_n_value_syntax.strip(',')
-        return(column_n_value_syntax)
\ No newline at end of file
+        return(column_n_value_syntax)
+
+    @staticmethod
+    def column_coercer(column_name: str, column_type: str, nullable: bool=True):
+        '''
+            Returns a function validating (and converting if needed) a value for a column,
+            by the column's type as described by SHOW COLUMNS.
+            'int' => '12' becomes 12, 'abc' raises ValueError
+            'varchar(5)' => 'abcdefg' raises ValueError
+        '''
+        column_type = column_type.lower()
+        base_type = re.split(r'[\s(]', column_type, 1)[0]
+        length = re.search(r'\((\d+)\)', column_type)
+        length = int(length.group(1)) if length and base_type in ('char', 'varchar') else None
+
+        convert = None
+        if base_type in ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'):
+            convert = int
+        elif base_type in ('float', 'double', 'real'):
+            convert = float
+        elif base_type in ('decimal', 'numeric'):
+            convert = Decimal
+
+        def coerce(value):
+            if value is None:
+                if not nullable:
+                    raise ValueError(f"column {column_name} can't be NULL")
+                return value
+
+            if convert is not None and not isinstance(value, (int, float, Decimal)):
+                try:
+                    value = convert(value.strip() if isinstance(value, str) else value)
+                except Exception:
+                    raise ValueError(f"column {column_name} expects {column_type}, got {value!r}")
+            elif convert is int and isinstance(value, (float, Decimal)):
+                if value != int(value):
+                    raise ValueError(f"column {column_name} expects {column_type}, got {value!r}")
+                value = int(value)
+
+            if length is not None and isinstance(value, str) and len(value) > length:
+                raise ValueError(f"column {column_name} holds up to {length} characters, got {len(value)}")
+            return value
+        return coerce
+
+    @staticmethod
+    def escape_field(value):
+        '''
+            Formats a value as a field of a LOAD DATA file (as bytes).
+            None => \\N, 'a\tb' => a\\tb, b'raw' => raw, True => 1
+        '''
+        if value is None:
+            return(b'\\N')
+        if isinstance(value, (bytes, bytearray)):
+            data = bytes(value)
+        elif isinstance(value, bool):
+            data = b'1' if value else b'0'
+        else:
+            data = str(value).encode('utf-8')
+        for character, escaped in ((b'\\', b'\\\\'), (b'\t', b'\\t'), (b'\n', b'\\n'), (b'\r', b'\\r'), (b'\0', b'\\0')):
+            data = data.replace(character, escaped)
+        return(data)
+
+    @staticmethod
+    def read_delimited(file_path: str):
+        '''
+            A generator reading a LOAD DATA file back into tuples of values,
+            undoing escape_field (fields that aren't valid UTF-8 are kept as bytes).
+        '''
+        escapes = {b't': b'\t', b'n': b'\n', b'r': b'\r', b'0': b'\0'}
+        unescape = lambda match: escapes.get(match.group(1), match.group(1))
+        with open(file_path, 'rb') as load_file:
+            for line in load_file:
+                row = []
+                for field in line.rstrip(b'\n').split(b'\t'):
+                    if field == b'\\N':
+                        row.append(None)
+                        continue
+                    field = re.sub(rb'\\(.)', unescape, field, flags=re.DOTALL)
+                    try:
+                        row.append(field.decode('utf-8'))
+                    except UnicodeDecodeError:
+                        row.append(field)
+                yield tuple(row)
+
+    @staticmethod
+    def column_buffer(column_type: str):
+        '''
+            Returns an empty buffer for the values of a column type.
+            integers => array('q') (array('Q') if unsigned), float/double => array('d'),
+            anything else => list
+        '''
+        if isinstance(column_type, (bytes, bytearray)):
+            column_type = column_type.decode('utf-8')
+        column_type = column_type.lower()
+        base_type = re.split(r'[\s(]', column_type, 1)[0]
+        if base_type in ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'):
+            return array('Q' if 'unsigned' in column_type else 'q')
+        if base_type in ('float', 'double', 'real'):
+            return array('d')
+        return []
+
+    @staticmethod
+    def coerce_row(coercers: list, row):
+        '''
+            Applies each column's coercer to its value, returns the coerced values as a tuple.
+        '''
+        if len(row) != len(coercers):
+            raise ValueError(f"{len(row)} values were given for {len(coercers)} columns")
+        return tuple(coerce(value) for coerce, value in zip(coercers, row))
+
+    @staticmethod
+    def unique_ids(record_ids):
+        '''
+            Drops duplicate IDs (compared by their string, so 12 and '12' are the same),
+            keeping the order they were given in.
+            [3, '3', 5, 3] => [3, 5]
+        '''
+        seen = set()
+        unique = []
+        for record_id in record_ids:
+            if str(record_id) not in seen:
+                seen.add(str(record_id))
+                unique.append(record_id)
+        return(unique)
+
+    @staticmethod
+    @lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def statement(operation: str, table_name: str, columns: tuple=(), rows: int=1, update_columns: tuple=()):
+        '''
+            Builds the SQL text of a query, results are kept in a bounded LRU cache
+            keyed by the shape of the query, so repeating shapes skip the string building.
+            'insert' => INSERT INTO table (a, b) VALUES (%s, %s)[,(%s, %s) * rows]
+            'upsert' => the insert above + ON DUPLICATE KEY UPDATE a=VALUES(a) for each of update_columns
+            'update' => update table set a= %s,b= %s where id = %s
+            'delete' => delete from table where id=%s
+            'select' => select * from table where id=%s
+            'select_in' => select * from table where id in (%s, %s * rows)
+            'delete_in' => delete from table where id in (%s, %s * rows)
+            (the cache can be inspected with MSQL.statement.cache_info())
+        '''
+        if operation == 'insert':
+            if not columns or rows < 1:
+                raise ValueError("ERROR: an insert needs at least one column and one row")
+            row_string = "(" + ", ".join([r"%s"] * len(columns)) + ")"
+            return(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES " + ",".join([row_string] * rows))
+        if operation == 'upsert':
+            if not update_columns:
+                raise ValueError("ERROR: an upsert needs at least one column to update")
+            update_string = ", ".join(f"{column}=VALUES({column})" for column in update_columns)
+            return(MSQL.statement('insert', table_name, columns, rows) + " ON DUPLICATE KEY UPDATE " + update_string)
+        if operation == 'update':
+            return(f'update {table_name} set ' + MSQL.update_record_syntax_help(columns) + r' where id = %s')
+        if operation == 'delete':
+            return(f"delete from {table_name} where id=%s")
+        if operation == 'select':
+            return(f"select * from {table_name} where id=%s")
+        if operation in ('select_in', 'delete_in'):
+            id_string = "(" + ", ".join([r"%s"] * rows) + ")"
+            if operation == 'select_in':
+                return(f"select * from {table_name} where id in {id_string}")
+            return(f"delete from {table_name} where id in {id_string}")
+        raise ValueError(f"ERROR: unknown operation {operation}")
\ No newline at end of file
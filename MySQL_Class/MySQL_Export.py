@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import Manager
+from queue import Empty
+
+from MySQL_Class import MSQL
+
+# Parallel export of a table, split to key ranges, each scanned in its own process #
+
+
+def split_ranges(db: MSQL, table_name: str, key: str='id', partitions: int=4):
+    '''
+        Splits a table to key ranges of (about) the same width,
+        by the minimum and maximum of an integer key.
+        Each range is a tuple of (after, up_to), holding the keys
+        greater than after and smaller or equal to up_to.
+        Example:
+        keys 1 to 1000 in 4 partitions => [(0, 250), (250, 500), (500, 750), (750, 1000)]
+
+        Returns an error string if the table can't be queried, or an empty list if it's empty.
+    '''
+    key_range = db.key_range(table_name, key)
+    if type(key_range) == str:
+        return(key_range)
+    if key_range["min"] is None:
+        return([])
+
+    low, high = int(key_range["min"]), int(key_range["max"])
+    partitions = max(1, min(partitions, high - low + 1))
+    width = (high - low + 1) / partitions
+    bounds = [low - 1] + [low - 1 + round(width * (index + 1)) for index in range(partitions)]
+    bounds[-1] = high
+    return([(bounds[index], bounds[index + 1]) for index in range(partitions)])
+
+
+def export_partition(connection_args: dict, table_name: str, partition: int, after: int, up_to: int,
+                     key: str='id', page_size: int=5000, output_path: str=None, file_format: str='csv',
+                     callback: callable=None, progress=None):
+    '''
+        Exports one key range of a table (runs inside a worker process).
+        The range is read with MSQL.scan on a connection of its own, and each page
+        is either written to output_path (csv/jsonl) or handed to callback(partition, rows).
+        If a progress queue is given, an event is put in it after each page.
+        Returns the partition's row count, duration and throughput (or its error).
+    '''
+    started = time.monotonic()
+    rows_done = 0
+    output = None
+    try:
+        db = MSQL(**connection_args)
+        pages = db.scan(table_name, key=key, page_size=page_size, start_after=after,
+                        where=f"{key} <= %s", params=(up_to,))
+        if type(pages) == str:
+            raise Exception(pages)
+
+        if callback is None:
+            columns = db.show_columns(table_name)
+            if type(columns) == str:
+                raise Exception(columns)
+            columns = list(columns["Columns"])
+            output = open(output_path, 'w', newline='', encoding='utf-8')
+            if file_format == 'csv':
+                writer = csv.writer(output)
+                writer.writerow(columns)
+
+        for page in pages:
+            if callback is not None:
+                callback(partition, page["rows"])
+            elif file_format == 'csv':
+                writer.writerows(page["rows"])
+            else:
+                for row in page["rows"]:
+                    output.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+
+            rows_done += len(page["rows"])
+            if progress is not None:
+                progress.put({"partition": partition, "rows": rows_done,
+                              "seconds": time.monotonic() - started})
+        db.close()
+    except Exception as error:
+        return({"partition": partition, "rows": rows_done, "error": f"ERROR: partition {partition} failed => {error}"})
+    finally:
+        if output is not None:
+            output.close()
+
+    seconds = time.monotonic() - started
+    return({"partition": partition, "after": after, "up_to": up_to, "rows": rows_done, "path": output_path,
+            "seconds": seconds, "rows_per_second": rows_done / seconds if seconds else 0.0})
+
+
+def export_table(db: MSQL, table_name: str, output_dir: str='./export', file_format: str='csv',
+                 key: str='id', partitions: int=None, workers: int=None, page_size: int=5000,
+                 callback: callable=None, on_progress: callable=None):
+    '''
+        Exports a table in parallel.
+        The table is split to key ranges (see split_ranges), and each range is
+        scanned in a process of a pool, on its own connection, so decoding the
+        rows scales with the cores available.
+        Each partition is written to its own file in output_dir
+        ({table_name}.part0000.csv and so on), or handed to callback instead.
+        Example of use:
+            db = MSQL('localhost', 'root', '123456', 'test_db')
+            export_table(db, 'test_table', './export', 'jsonl', workers=8, on_progress=print)
+
+        Params
+        ------
+            1.  db - An MSQL object, the workers create theirs with its connection_args().
+            2.  table_name - The table to export.
+            3.  output_dir - A directory for the partition files, created if missing.
+            4.  file_format - Either csv or jsonl.
+            5.  key - An integer unique column to split and scan the table by.
+            6.  partitions - Amount of key ranges, defaults to the amount of workers.
+            7.  workers - Amount of processes, defaults to the amount of cores.
+            8.  page_size - Records read from the server at a time.
+            9.  callback - If given, it's called as callback(partition, rows) in the workers
+                for each page instead of writing files, it must be a module level
+                function so it can be sent to the workers.
+            10. on_progress - If given, it's called (in this process) with an event dict
+                as pages of each partition are exported, and with its result once it's done.
+
+        Returns a summary with the total rows, duration and throughput, and a result
+        per partition (holding an error instead if it failed), or an error string.
+    '''
+    if file_format not in ('csv', 'jsonl'):
+        return(f"ERROR: unsupported file format {file_format}, use csv or jsonl")
+
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(db, table_name, key, partitions or workers)
+    if type(ranges) == str:
+        return(ranges)
+    if callback is None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    connection_args = db.connection_args()
+    started = time.monotonic()
+    results = []
+
+    with Manager() as manager:
+        progress = manager.Queue() if on_progress is not None else None
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for partition, (after, up_to) in enumerate(ranges):
+                output_path = None
+                if callback is None:
+                    output_path = os.path.join(output_dir, f"{table_name}.part{partition:04d}.{file_format}")
+                pending.add(pool.submit(export_partition, connection_args, table_name, partition, after, up_to,
+                                        key, page_size, output_path, file_format, callback, progress))
+
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                while progress is not None:
+                    try:
+                        on_progress(progress.get_nowait())
+                    except Empty:
+                        break
+                for future in done:
+                    result = future.result()
+                    results.append(result)
+                    if on_progress is not None:
+                        on_progress(result)
+
+    seconds = time.monotonic() - started
+    total = sum(result["rows"] for result in results)
+    return({"table": table_name, "rows": total, "seconds": seconds,
+            "rows_per_second": total / seconds if seconds else 0.0,
+            "partitions": sorted(results, key=lambda result: result["partition"])})
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import socket
+import unittest
+import uuid
+
+# Runs against the server of run_MySQL_docker.cmd (or the one in MYSQL_HOST/MYSQL_PORT/MYSQL_USER/MYSQL_PASSWORD),
+# and is skipped if it can't be reached #
+
+HOST = os.environ.get('MYSQL_HOST', 'localhost')
+PORT = int(os.environ.get('MYSQL_PORT', '3306'))
+USER = os.environ.get('MYSQL_USER', 'root')
+PASSWORD = os.environ.get('MYSQL_PASSWORD', '123456')
+
+try:
+    from MySQL_Async import AsyncMSQL
+except ImportError:
+    AsyncMSQL = None
+
+
+def server_reachable():
+    try:
+        with socket.create_connection((HOST, PORT), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+@unittest.skipIf(AsyncMSQL is None, "aiomysql isn't installed")
+@unittest.skipUnless(server_reachable(), f"no MySQL server at {HOST}:{PORT}")
+class AsyncMSQLTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.database_name = f"async_test_{uuid.uuid4().hex[:8]}"
+        server = AsyncMSQL(HOST, USER, PASSWORD, port=PORT)
+        self.assertEqual(await server.create_db(self.database_name), {'DB': self.database_name})
+        await server.close()
+
+        self.db = AsyncMSQL(HOST, USER, PASSWORD, self.database_name, port=PORT, pool_max=10)
+        result = await self.db.create_table('test_table', '(id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), age INT)')
+        self.assertEqual(result, {"DB": self.database_name, "Table": 'test_table'})
+
+    async def asyncTearDown(self):
+        await self.db._execute(f"DROP DATABASE {self.database_name}")
+        await self.db.close()
+
+    async def test_concurrent_inserts_and_finds(self):
+        inserted = await asyncio.gather(*(self.db.insert_record('test_table', ('name', 'age'), (f'user{i}', i))
+                                          for i in range(50)))
+        self.assertTrue(all(type(result) == dict for result in inserted), inserted)
+        ids = [int(result["id"]) for result in inserted]
+        self.assertEqual(len(set(ids)), 50)
+
+        records = await asyncio.gather(*(self.db.find_record('test_table', record_id) for record_id in ids))
+        self.assertEqual(sorted(record[2] for record in records), list(range(50)))
+        for record_id, record in zip(ids, records):
+            self.assertEqual(record[0], record_id)
+
+        # the reads leave no transaction open, so their connections stay in the pool
+        self.assertLessEqual(self.db.pool.size, self.db.pool_max)
+        self.assertEqual(self.db.pool.freesize, self.db.pool.size)
+
+    async def test_find_records_and_update(self):
+        result = await self.db.insert_record('test_table', ('name', 'age'), ('bob', 22))
+        await self.db.update_record('test_table', ('age',), (23,), result["id"])
+        records = await self.db.find_records('test_table', 'name', 'bob')
+        self.assertEqual([list(record) for record in records], [[int(result["id"]), 'bob', 23]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,64 @@
-import pika
+import heapq
+import io
+import json
+import pickle
+import tempfile
+import time
 import uuid
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+import pika
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# longest a wait for replies blocks in one call to process_data_events,
+# so requests that timed out are expired in time
+RPC_POLL_INTERVAL = 1.0
+
+# bytes per chunk sent by send_large, and bytes of chunks consume_large keeps in memory
+# (across all messages being reassembled) before moving them to temporary files
+LARGE_CHUNK_SIZE = 4 * 1024 * 1024
+LARGE_MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+def text_encode(message):
+    return str(message).encode('utf-8')
+
+
+def raw_encode(message):
+    if isinstance(message, str):
+        return message.encode('utf-8')
+    # bytes, bytearray and memoryview are published as they are, without a copy
+    return message
+
+
+# codec name => (content_type, encode, decode)
+CODECS = {
+    'text': ('text/plain', text_encode, lambda body: body.decode('utf-8')),
+    'raw': ('application/octet-stream', raw_encode, lambda body: body),
+    'json': ('application/json', lambda message: json.dumps(message, separators=(',', ':')).encode('utf-8'), json.loads),
+    'pickle': ('application/x-python-pickle', lambda message: pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+}
+if msgpack is not None:
+    CODECS['msgpack'] = ('application/msgpack', lambda message: msgpack.packb(message, use_bin_type=True),
+                         lambda body: msgpack.unpackb(body, raw=False))
+CONTENT_TYPES = {content_type: name for name, (content_type, _, _) in CODECS.items()}
+
+# content_encoding => (compress, decompress)
+COMPRESSIONS = {'zlib': (zlib.compress, zlib.decompress)}
+if lz4 is not None:
+    COMPRESSIONS['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
 
 
 class Rabbit:
@@ -24,9 +83,11 @@ class Rabbit:
                 declare/delete queues, publish/consume messages and more.
           channel.qos:
                 Decides how theis object will consume messages in temrs of quality.
-                IN THIS CASE it is used to tell the consumer to take 1 message at a time.
+                By default it is used to tell the consumer to take 1 message at a time.
                 As opposed to taking 10 messages messages from the server at once, and 
                 still dealing with them one message at a time.
+          prefetch: int
+                Amount of unacked messages the server sends the consumers at once (the qos above).
           callback_queue: str
                 (Recommended to leave the default)
                 The name of an auto-genereated queue, which is also 
@@ -47,6 +108,26 @@ class Rabbit:
                 (For the use of send_n_receive) This attribute = None 
                 until an answer with the right id arrives. 
                 And then response = body of that message.
+          requests: dict
+                The requests sent by send_request still awaiting an answer,
+                a future per correlation id.
+          dropped_replies: int
+                Answers that arrived for no pending request (late or unknown) and were dropped.
+          verified_queues: set
+                Names of queues known to exist on this connection (see check_queue).
+          verified_exchanges: set
+                Names of exchanges known to exist on this connection (see check_exchange).
+          codec: str
+                How messages are serialized - 'text' (str() of the message, the default),
+                'raw' (bytes as they are), 'json', 'msgpack' or 'pickle'.
+                With 'text' every message received is decoded as utf-8 text, with any
+                other codec messages are decoded by their content_type.
+          compression: str
+                'zlib' or 'lz4' to compress bodies of compress_threshold bytes or more (None - never).
+          allow_pickle: bool
+                Whether pickled messages received are loaded (only from trusted producers!).
+          confirm_channel: connection.channel
+                A channel in confirm mode used by send_many (None until it's first needed).
 
           Methods 
           -------
@@ -56,6 +137,12 @@ class Rabbit:
                 Declares an exchange to the server to be used later on.
           close_connection:
                 Closes the connection to the server.
+          setup_channel(), reopen_channel():
+                Set up the channel (prefetch, callback queue), and replace one the broker closed.
+          check_queue(queue_name: str), check_exchange(exchange_name: str):
+                Checks a queue/exchange exists, once per connection (the answer is cached).
+          forget_verified():
+                Drops the cache of queues/exchanges known to exist.
           check_corr_id(channel, method, properties, body):
                 Compares the ID given to the message sent, 
                 and the one of message answered.
@@ -65,9 +152,10 @@ class Rabbit:
           consume_one(queue_name: str, func):
                 Consumes one message from given queue, executes one function 
                 when the message is consumed uses it.
-          consume_many(queue_name: str, func):
+          consume_many(queue_name: str, func, prefetch=None, workers=None):
                 Same as consume one, but loops on consumption. so each time 
-                a message is received the function is executed.
+                a message is received the function is executed
+                (in a pool of workers threads if given).
           send_n_receive(queue_name: str, message: str, exchange_name=''):
                 Sends one message with an ID, and awaits the arrival of a message with same id.
                 To receive an answer the consumer of the original must
@@ -75,12 +163,43 @@ class Rabbit:
           receive_n_send_one(queue_name: str, func):
                 Consume one message, execute a function with it, and return an answer
                 with the same message ID.
-          receive_n_send_many(queue_name: str, func):
+          receive_n_send_many(queue_name: str, func, reply_to_exchange='', prefetch=None, workers=None):
                 Consumes a message, execute a function with it, and return an answer
                 with the same message ID. Keeps looping this way.
+          consume_batches(queue_name: str, func, max_batch=500, max_wait_ms=1000, prefetch=None, requeue=True):
+                Consumes endlessly, executing the function with lists of messages,
+                and acking (or nacking) each list at once.
+          set_prefetch(prefetch=None, workers=None):
+                Sets the amount of unacked messages consumers are sent at once.
+          consume_in_pool(queue_name: str, func, workers: int, on_result):
+                Consumes endlessly, running the function in a pool of threads.
+          send_many(queue_name: str, messages, batch_size=100, confirm=True, exchange_name='', timeout=30):
+                Sends many messages, pipelined in batches, each confirmed by the broker at once.
+                Returns the messages that failed.
+          send_request(queue_name: str, message: str, exchange_name='', timeout=None):
+                Same as send_n_receive, but returns a future instead of waiting,
+                so many requests can be in flight at once.
+          open_confirm_channel(), close_confirm_channel(), on_confirm(frame), wait_confirms(channel, timeout=30):
+                Manage the confirm channel used by send_many and send_large.
+          send_large(queue_name: str, source, exchange_name='', chunk_size=LARGE_CHUNK_SIZE, confirm=True, window=16, timeout=30):
+                Sends a large payload (bytes or a binary file) in chunks.
+          consume_large(queue_name: str, func, max_memory=LARGE_MEMORY_LIMIT, max_age=600):
+                Consumes endlessly, reassembling chunked messages and handing them
+                to the function as files.
+          expire_requests():
+                Fails the futures of the requests whose timeout passed.
+          wait_replies(futures=None, timeout=None):
+                Processes the answers until the futures given (or all pending ones) are done.
+          gather_replies(futures, timeout=None):
+                Waits for the futures given and returns their answers in order.
+          encode(message, codec=None):
+                Serializes (and compresses) a message, returns its body and properties.
+          decode(body, properties):
+                Deserializes a body by its content_type/content_encoding.
     '''
 
-    def __init__(self, host='localhost', callback_queue='', credentials=None):
+    def __init__(self, host='localhost', callback_queue='', credentials=None, prefetch=1,
+                 codec='text', compression=None, compress_threshold=1024, allow_pickle=None):
         '''
               Upon initialization, the object will connect to the server,
               open a channel, declare a callback queue, and basic consume.
@@ -99,6 +218,24 @@ class Rabbit:
               credentials:
                     If you're not using the default user, 
                     you'll have to specify credentials
+              prefetch: int
+                    Amount of unacked messages the consumers of this object
+                    are sent at once (1 by default).
+              codec: str
+                    How this object serializes the messages it sends - 'text' (str() of the message,
+                    as always), 'raw', 'json', 'msgpack' or 'pickle'.
+                    It's sent as the message's content_type, so consumers using a codec other
+                    than 'text' decode each message by it whatever their own codec is,
+                    and answer with it. Consumers left with 'text' decode every message
+                    as utf-8 text, as they always did.
+              compression: str
+                    'zlib' or 'lz4' (if installed) to compress message bodies,
+                    sent as the message's content_encoding.
+              compress_threshold: int
+                    Bodies smaller than this many bytes aren't compressed.
+              allow_pickle: bool
+                    Load pickled messages received (True by default only if codec='pickle'),
+                    unpickling can run code, so only for trusted producers.
 
               Raises
               ------
@@ -106,10 +243,27 @@ class Rabbit:
                     If no connection can be made or the creds are wrong,
                     this error will be raised.
                     It will inform the the user.
+              ValueError:
+                    If the codec or compression is unknown (or not installed).
         '''
 
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec}, use one of {', '.join(CODECS)} (msgpack needs the msgpack package)")
+        if compression != None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression}, use one of {', '.join(COMPRESSIONS)} (lz4 needs the lz4 package)")
+        self.codec, self.compression, self.compress_threshold = codec, compression, compress_threshold
+        self.allow_pickle = codec == 'pickle' if allow_pickle == None else allow_pickle
+
         self.host = host
         self.credentials = credentials
+        self.msg_id, self.response, self.response_properties = None, None, None
+        # correlation id => future, and a heap of (deadline, correlation id)
+        self.requests, self.request_deadlines = {}, []
+        self.dropped_replies = 0
+        # verified once per connection, instead of on every publish/consume
+        self.verified_queues, self.verified_exchanges = set(), set()
+        # the confirm channel's next delivery tag, and delivery tag => message not confirmed yet
+        self.confirm_channel, self.confirm_tag, self.unconfirmed, self.nacked = None, 0, {}, []
         if credentials == None:
             self.rabbit_parameters = pika.ConnectionParameters(self.host)
         else:
@@ -124,11 +278,19 @@ class Rabbit:
             raise Exception(
                 "Couldn't initialize object.\n           RabbitMQ server could not be contacted...")
 
-        self.channel.basic_qos(prefetch_count=1)
+        self.prefetch = prefetch
+        self.callback_queue_name = callback_queue
+        self.setup_channel()
+
+    def setup_channel(self):
+        '''
+              Sets the channel's prefetch, declares the callback queue and consumes it.
+        '''
+        self.channel.basic_qos(prefetch_count=self.prefetch)
 
         # declaring queue for returning answers
         queue_default_name = self.channel.queue_declare(
-            queue=callback_queue, exclusive=True, auto_delete=True)
+            queue=self.callback_queue_name, exclusive=True, auto_delete=True)
         self.callback_queue = queue_default_name.method.queue
 
         # creating basic consume basic consume for returning answers
@@ -138,6 +300,24 @@ class Rabbit:
             on_message_callback=self.check_corr_id,
             auto_ack=True)
 
+    def reopen_channel(self):
+        '''
+              Opens a new channel on the same connection in place of one the broker closed
+              (ie after a passive declare of a missing queue), keeping the object's settings.
+              The callback queue was deleted along with the closed channel's consumer, so it's
+              declared again, if its name was generated by the server the new one differs, and
+              the pending requests (whose answers can't reach it anymore) are failed.
+        '''
+        self.forget_verified()
+        previous = self.callback_queue
+        self.channel = self.connection.channel()
+        self.setup_channel()
+        if self.callback_queue != previous:
+            for correlation_id, future in self.requests.items():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'The callback queue of request {correlation_id} was lost'))
+            self.requests, self.request_deadlines = {}, []
+
     def declare_queue(self, queue_name: str, passive=False, durable=False, exclusive=False, auto_delete=False, arguments=None):
         '''
               Declares a queue to server (just an extension to pika's queue declare)
@@ -170,6 +350,7 @@ class Rabbit:
                                    exclusive=exclusive,
                                    auto_delete=auto_delete,
                                    arguments=arguments)
+        self.verified_queues.add(queue_name)
 
     def declare_exchange(self, exchange_name: str, exchange_type='direct', passive=False, durable=False, auto_delete=False, internal=False, arguments=None):
         '''
@@ -207,19 +388,149 @@ class Rabbit:
                                       auto_delete=auto_delete,
                                       internal=internal,
                                       arguments=arguments)
+        self.verified_exchanges.add(exchange_name)
+
+    def encode(self, message, codec=None):
+        '''
+              Serializes a message with the codec given (the object's by default),
+              and compresses it if it's large enough and compression is set.
+              Returns the body, and the properties (content_type, content_encoding) describing it.
+
+              Parameters
+              ----------
+              message:
+                    The message to serialize.
+              codec: str (optional)
+                    A codec name, see the codec attribute.
+        '''
+        content_type, encode, _ = CODECS[codec or self.codec]
+        body = encode(message)
+        content_encoding = None
+        if self.compression != None and len(body) >= self.compress_threshold:
+            body = COMPRESSIONS[self.compression][0](body)
+            content_encoding = self.compression
+        return body, {"content_type": content_type, "content_encoding": content_encoding}
+
+    def decode(self, body, properties):
+        '''
+              Deserializes a received body by its content_encoding and content_type.
+              Decoding by content_type is only done if the object's codec isn't 'text',
+              so objects that didn't opt into codecs get utf-8 text whatever the producer set.
+              Bodies without a known content_type (ie from producers that don't set it)
+              are decoded as utf-8 text, as they always were.
+
+              Parameters
+              ----------
+              body: bytes
+                    The message as received.
+              properties:
+                    The properties object of the received message.
+
+              Raises
+              ------
+              ValueError if the body is compressed with lz4 and it isn't installed,
+              or is pickled and the object doesn't allow pickle.
+        '''
+        body = self.decompress(body, properties)
+        if self.codec == 'text':
+            return CODECS['text'][2](body)
+        codec = CONTENT_TYPES.get(getattr(properties, 'content_type', None), 'text')
+        if codec == 'pickle' and not self.allow_pickle:
+            raise ValueError("Received a pickled message, but allow_pickle isn't set")
+        return CODECS[codec][2](body)
+
+    def decompress(self, body, properties):
+        '''
+              Decompresses a received body by its content_encoding (if it's compressed),
+              returns the bytes.
+              Other content encodings (ie 'utf-8', 'binary' or 'identity' set by
+              other producers) aren't compressions, the body is returned as is.
+        '''
+        content_encoding = getattr(properties, 'content_encoding', None)
+        if content_encoding in COMPRESSIONS:
+            body = COMPRESSIONS[content_encoding][1](body)
+        elif content_encoding == 'lz4':
+            raise ValueError("Can't decompress a message compressed with lz4, the lz4 package isn't installed")
+        return body
+
+    def reply_codec(self, properties):
+        '''
+              The codec to answer a message with - the one it was sent with if it's known
+              (so the sender can decode the answer), otherwise text.
+        '''
+        return CONTENT_TYPES.get(getattr(properties, 'content_type', None), 'text')
 
     def close_connection(self):
         '''
               Closes the object's connection to the server.
         '''
+        self.forget_verified()
         self.connection.close()
 
+    def check_queue(self, queue_name: str):
+        '''
+              Returns whether a queue exists, checking it with a passive declare
+              only the first time it's asked about on this connection (or after the cache was dropped),
+              so hot paths make no extra round trip.
+              The cache is dropped once the channel is closed, since whatever closed it
+              (ie a 404 of a deleted queue/exchange) might have made it stale.
+              A queue deleted after it was verified goes unnoticed though - publishing to it
+              doesn't fail, the broker drops the messages it can't route.
+              Call forget_verified() after deleting queues for them to be checked again.
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to check.
+        '''
+        if self.channel.is_closed:
+            self.forget_verified()
+        elif queue_name in self.verified_queues:
+            return True
+        try:
+            self.declare_queue(queue_name, True)
+        except:
+            return False
+        return True
+
+    def check_exchange(self, exchange_name: str):
+        '''
+              Same as check_queue, for an exchange (the default exchange '' always exists).
+
+              Parameters
+              ----------
+              exchange_name: str
+                    Exchange name to check.
+        '''
+        if exchange_name == '':
+            return True
+        if self.channel.is_closed:
+            self.forget_verified()
+        elif exchange_name in self.verified_exchanges:
+            return True
+        try:
+            self.declare_exchange(exchange_name, passive=True)
+        except:
+            return False
+        return True
+
+    def forget_verified(self):
+        '''
+              Drops the cache of queues and exchanges known to exist,
+              they're checked again on next use.
+        '''
+        self.verified_queues, self.verified_exchanges = set(), set()
+
     def check_corr_id(self, ch, method, properties, body):
         '''
               Checks if the received message's Id is the same as this object msgID 
               (which is the Id of the message sent).
               If the IDs are the same, the message's body will fill 
               the object's response. 
+              Otherwise, if the ID is of a pending request (see send_request),
+              its future is resolved with the decoded body.
+              Answers with any other ID (late answers of requests that timed out,
+              or unknown ones) are dropped.
               It's usually used only by send_n_receive as a callback function.
 
               Parameters
@@ -234,8 +545,18 @@ class Rabbit:
                     the message itself ( a string )
         '''
 
-        if self.msg_id == properties.correlation_id:
-            self.response = body
+        if self.msg_id != None and self.msg_id == properties.correlation_id:
+            self.response, self.response_properties = body, properties
+            return
+
+        future = self.requests.pop(properties.correlation_id, None)
+        if future is None or future.done():
+            self.dropped_replies += 1
+            return
+        try:
+            future.set_result(self.decode(body, properties))
+        except Exception as error:
+            future.set_exception(error)
 
     def send_one(self, queue_name: str, message: str, exchange_name='', **kwargs):
         '''
@@ -254,25 +575,250 @@ class Rabbit:
 
               Raises
               ------
-              Checks if the queue exists.
+              Checks if the queue (and the exchange) exists, once per connection (see check_queue).
               If it doesn't exist, an exception will be returned.
+              Since a queue known to exist isn't checked again, a message sent to it after it was
+              deleted is dropped by the broker (and SUCCESS is still returned).
+              An exchange deleted since makes the broker close the channel, which is reported
+              by this publish or the next one on the channel as an error.
         '''
 
         # first check if queue exists
+        if not self.check_queue(queue_name):
+            return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
+        if not self.check_exchange(exchange_name):
+            return(f'ERROR: Exchange named {exchange_name} not found. \n       Consider declaring it first.')
+
+        body, encoding = self.encode(message)
         try:
-            self.declare_queue(queue_name, True)
+            self.channel.basic_publish(exchange=exchange_name,
+                                       routing_key=queue_name,
+                                       body=body,
+                                       properties=pika.BasicProperties(delivery_mode=2, **encoding))
+        except pika.exceptions.ChannelWrongStateError:
+            # the broker closed the channel after an earlier call (ie one publishing to a deleted exchange),
+            # whatever was verified might have been deleted since
+            self.forget_verified()
+            return(f'ERROR: The channel was closed by the server, the message was not sent to queue named {queue_name}')
+        except pika.exceptions.ChannelClosedByBroker as error:
+            self.forget_verified()
+            # publishing only fails with 404 on a missing exchange (unroutable messages are dropped)
+            if error.reply_code == 404:
+                return(f'ERROR: Exchange named {exchange_name} not found. \n       Consider declaring it first.')
+            raise
 
-        except:
+        return(f'SUCCESS: Message sent to queue named => {queue_name}')
+
+    def send_many(self, queue_name: str, messages, batch_size=100, confirm=True, exchange_name='', timeout=30):
+        '''
+              Confirms the queue exists and then sends all the messages given to it.
+              The messages are published batch_size at a time without waiting in between,
+              and (with confirm=True) on a channel in confirm mode, where the broker
+              acks each batch as a whole (rather than each message on its own)
+              before the next batch is sent.
+              By using delivery_mode = 2 the messages are marked as persistent.
+              Returns a list of the messages that failed - nacked by the broker,
+              or not confirmed within the timeout (an empty list if all were confirmed).
+              Example of use:
+              failed = rabbit.send_many('example1', (f'message {i}' for i in range(100000)), batch_size=500)
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to send the messages to.
+              messages: iterable
+                    The messages that will be sent.
+              batch_size: int (optional)
+                    Messages published before waiting for their confirms.
+              confirm: bool (optional)
+                    Wait for the broker's confirms, without it nothing is known to have failed.
+              exchange_name: str (optional)
+                    Exchange name to send the messages to.
+              timeout: float (optional)
+                    Seconds to wait for the confirms of a batch.
+
+              Raises
+              ------
+              Checks if the queue exists.
+              If it doesn't exist, an exception will be returned.
+        '''
+
+        # first check if queue exists
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
-        self.channel.basic_publish(exchange=exchange_name,
-                                   routing_key=queue_name,
-                                   body=str(message),
-                                   properties=pika.BasicProperties(delivery_mode=2,))
+        # (content_type, content_encoding) => properties, there are only a couple of them
+        properties = {}
+
+        def encode(message):
+            body, encoding = self.encode(message)
+            key = (encoding["content_type"], encoding["content_encoding"])
+            if key not in properties:
+                properties[key] = pika.BasicProperties(delivery_mode=2, **encoding)
+            return body, properties[key]
+
+        messages = iter(messages)
+        failed = []
+        while True:
+            batch = list(islice(messages, batch_size))
+            if not batch:
+                return failed
+
+            if not confirm:
+                for message in batch:
+                    body, message_properties = encode(message)
+                    self.channel.basic_publish(exchange=exchange_name, routing_key=queue_name,
+                                               body=body, properties=message_properties)
+                continue
+
+            channel = self.open_confirm_channel()
+            for message in batch:
+                body, message_properties = encode(message)
+                self.confirm_tag += 1
+                self.unconfirmed[self.confirm_tag] = message
+                # the underlying channel's publish doesn't wait for the confirm
+                channel._impl.basic_publish(exchange=exchange_name, routing_key=queue_name,
+                                            body=body, properties=message_properties)
+
+            failed.extend(self.wait_confirms(channel, timeout))
+
+    def wait_confirms(self, channel, timeout=30):
+        '''
+              Waits until everything published on the confirm channel was confirmed,
+              the channel closed or the timeout passed.
+              Returns what was nacked or left unconfirmed (and drops the channel in the latter case).
+        '''
+        deadline = time.monotonic() + timeout
+        while self.unconfirmed and not channel.is_closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.connection.process_data_events(time_limit=remaining)
+
+        failed, self.nacked = self.nacked, []
+        if self.unconfirmed:
+            # the channel is dropped, so late confirms can't be mixed with the next batch's
+            failed.extend(self.unconfirmed.values())
+            self.close_confirm_channel()
+        return failed
+
+    def send_large(self, queue_name: str, source, exchange_name='', chunk_size=LARGE_CHUNK_SIZE, confirm=True, window=16, timeout=30):
+        '''
+              Confirms the queue exists and then sends a large payload to it, split to chunks
+              of chunk_size bytes, so no message gets near the broker's frame/memory limits.
+              The chunks share an ID and are numbered (in the x-chunk-id, x-chunk-index,
+              x-chunk-offset, x-chunk-size and x-chunk-last headers), to be reassembled by consume_large.
+              A file is read a chunk at a time, so the payload is never held in memory as a whole
+              (a read might return less than chunk_size, each chunk carries its byte offset in the payload).
+              With confirm=True, up to window chunks are sent before waiting for the broker's confirms.
+              Chunks are compressed if the object's compression is set.
+              Example of use:
+              with open('dump.bin', 'rb') as dump:
+                    rabbit.send_large('dumps', dump)
 
-        return(f'SUCCESS: Message sent to queue named => {queue_name}')
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to send the payload to.
+              source: bytes/file
+                    The payload - bytes (bytearray, memoryview) or a file opened for binary reading.
+              exchange_name: str (optional)
+                    Exchange name to send the payload to.
+              chunk_size: int (optional)
+                    Bytes per chunk.
+              confirm: bool (optional)
+                    Wait for the broker's confirms of the chunks.
+              window: int (optional)
+                    Chunks sent before waiting for their confirms.
+              timeout: float (optional)
+                    Seconds to wait for the confirms of a window.
 
-    def send_n_receive(self, queue_name: str, message: str, exchange_name=''):
+              Raises
+              ------
+              Checks if the queue exists.
+              If it doesn't exist, an exception will be returned.
+              If a chunk is nacked or not confirmed in time, an error will be returned
+              (the chunks sent are dropped by the consumer once they're old enough).
+        '''
+
+        # first check if queue exists
+        if not self.check_queue(queue_name):
+            return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            chunks = (view[start:start + chunk_size] for start in range(0, max(len(view), 1), chunk_size))
+        else:
+            chunks = iter(partial(source.read, chunk_size), b'')
+
+        chunk_id = str(uuid.uuid4())
+        channel = self.open_confirm_channel() if confirm else self.channel
+        index, offset, chunk = 0, 0, next(chunks, b'')
+        while True:
+            # reading one chunk ahead tells whether this one is the last
+            following = next(chunks, None)
+            body, encoding = self.encode(bytes(chunk), 'raw')
+            properties = pika.BasicProperties(delivery_mode=2, **encoding,
+                                              headers={"x-chunk-id": chunk_id, "x-chunk-index": index,
+                                                       "x-chunk-offset": offset, "x-chunk-size": chunk_size,
+                                                       "x-chunk-last": following is None})
+            if confirm:
+                self.confirm_tag += 1
+                self.unconfirmed[self.confirm_tag] = index
+                channel._impl.basic_publish(exchange=exchange_name, routing_key=queue_name,
+                                            body=body, properties=properties)
+                if len(self.unconfirmed) >= window or following is None:
+                    failed = self.wait_confirms(channel, timeout)
+                    if failed:
+                        return(f'ERROR: Chunks {failed} of message {chunk_id} were not confirmed by the server')
+            else:
+                channel.basic_publish(exchange=exchange_name, routing_key=queue_name,
+                                      body=body, properties=properties)
+
+            if following is None:
+                return(f'SUCCESS: Message {chunk_id} sent to queue named => {queue_name} in {index + 1} chunks')
+            index, offset, chunk = index + 1, offset + len(chunk), following
+
+    def open_confirm_channel(self):
+        '''
+              Returns the channel used by send_many, opening it in confirm mode if needed.
+        '''
+        if self.confirm_channel is None or self.confirm_channel.is_closed:
+            self.confirm_channel = self.connection.channel()
+            self.confirm_tag, self.unconfirmed, self.nacked = 0, {}, []
+            self.confirm_channel._impl.confirm_delivery(ack_nack_callback=self.on_confirm)
+        return self.confirm_channel
+
+    def close_confirm_channel(self):
+        '''
+              Closes the channel used by send_many (it's opened again when needed).
+        '''
+        channel, self.confirm_channel = self.confirm_channel, None
+        self.unconfirmed, self.nacked = {}, []
+        try:
+            if channel is not None and not channel.is_closed:
+                channel.close()
+        except:
+            pass
+
+    def on_confirm(self, frame):
+        '''
+              Called by the confirm channel with the broker's ack/nack of one message
+              (or of all messages up to it, if multiple is set).
+              Nacked messages are kept to be returned by send_many.
+        '''
+        delivery_tag, multiple = frame.method.delivery_tag, frame.method.multiple
+        nacked = isinstance(frame.method, pika.spec.Basic.Nack)
+        tags = [tag for tag in self.unconfirmed if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in tags:
+            message = self.unconfirmed.pop(tag, None)
+            if nacked and message is not None:
+                self.nacked.append(message)
+        if not self.unconfirmed:
+            # wakes up process_data_events, which doesn't return on its own for these
+            self.connection.add_callback_threadsafe(lambda: None)
+
+    def send_n_receive(self, queue_name: str, message: str, exchange_name='', timeout=None):
         '''
               Sends a message and awaits an answer.
               Consumer MUST be either receive_n_send_one/many.
@@ -300,33 +846,161 @@ class Rabbit:
                     Exchange name to send the message to.
               message: str
                     The message that will be sent.
+              timeout: float (optional)
+                    Seconds to wait for the answer (forever by default).
 
               Raises
               ------
               Checks if the queue exists.
               If it doesn't exist, an exception will be returned.
+              If no answer arrives within the timeout, an error will be returned
+              (and the answer is dropped if it arrives later).
         '''
 
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
-            self.__init__(host=self.host, credentials=self.credentials)
+        if not self.check_queue(queue_name) and self.channel.is_closed:
+            self.reopen_channel()
             # return(f"ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.")
 
         self.response = None
         self.msg_id = str(uuid.uuid4())
+        body, encoding = self.encode(message)
         publish_params = pika.BasicProperties(
-            correlation_id=self.msg_id, reply_to=self.callback_queue,)
+            correlation_id=self.msg_id, reply_to=self.callback_queue, **encoding)
 
         self.channel.basic_publish(exchange=exchange_name,
                                    routing_key=queue_name,
                                    properties=publish_params,
-                                   body=str(message))
+                                   body=body)
 
+        deadline = None if timeout == None else time.monotonic() + timeout
         while self.response == None:
-            self.connection.process_data_events()
-        return self.response.decode('utf-8')
+            remaining = RPC_POLL_INTERVAL if deadline == None else deadline - time.monotonic()
+            if remaining <= 0:
+                self.msg_id = None
+                return(f'ERROR: No answer from queue named {queue_name} within {timeout} seconds')
+            # blocks until the answer (or any other event) arrives, instead of spinning
+            self.connection.process_data_events(time_limit=min(remaining, RPC_POLL_INTERVAL))
+        self.msg_id = None
+        return self.decode(self.response, self.response_properties)
+
+    def send_request(self, queue_name: str, message: str, exchange_name='', timeout=None):
+        '''
+              Sends a message like send_n_receive, but returns a future instead of awaiting the answer,
+              so one object can have many requests in flight.
+              The futures are resolved (with the decoded answer) while this object processes events,
+              by wait_replies/gather_replies (or any other waiting/consuming of the object),
+              so they should be waited for through these and not future.result() alone.
+              Example of use:
+              futures = [rabbit.send_request('rpc_queue', i, timeout=30) for i in range(1000)]
+              answers = rabbit.gather_replies(futures)
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to send the message to.
+              message: str
+                    The message that will be sent.
+              exchange_name: str (optional)
+                    Exchange name to send the message to.
+              timeout: float (optional)
+                    Seconds until the request expires, then its future fails with a TimeoutError
+                    and its answer is dropped if it arrives later.
+
+              Raises
+              ------
+              Checks if the queue exists.
+              If it doesn't exist, an exception will be returned.
+        '''
+
+        # first check if queue exists
+        if not self.check_queue(queue_name):
+            return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
+
+        correlation_id = str(uuid.uuid4())
+        future = Future()
+        future.correlation_id = correlation_id
+        self.requests[correlation_id] = future
+        if timeout != None:
+            heapq.heappush(self.request_deadlines, (time.monotonic() + timeout, correlation_id))
+
+        body, encoding = self.encode(message)
+        self.channel.basic_publish(exchange=exchange_name,
+                                   routing_key=queue_name,
+                                   properties=pika.BasicProperties(
+                                       correlation_id=correlation_id, reply_to=self.callback_queue, **encoding),
+                                   body=body)
+        return future
+
+    def expire_requests(self):
+        '''
+              Fails the futures of the requests whose timeout passed with a TimeoutError,
+              and forgets them (so their answers are dropped).
+        '''
+        now = time.monotonic()
+        while self.request_deadlines and self.request_deadlines[0][0] <= now:
+            _, correlation_id = heapq.heappop(self.request_deadlines)
+            future = self.requests.pop(correlation_id, None)
+            if future is not None and not future.done():
+                future.set_exception(TimeoutError(f'No answer for request {correlation_id}'))
+
+    def wait_replies(self, futures=None, timeout=None):
+        '''
+              Processes the incoming answers until the futures given
+              (or all of the pending requests if none are given) are done,
+              blocking on the connection between answers instead of spinning.
+              Returns the amount of futures still not done (0 if all of them are).
+
+              Parameters
+              ----------
+              futures: list (optional)
+                    Futures returned by send_request.
+              timeout: float (optional)
+                    Seconds to wait at most (forever by default).
+        '''
+        deadline = None if timeout == None else time.monotonic() + timeout
+        while True:
+            self.expire_requests()
+            waiting = [future for future in (self.requests.values() if futures == None else futures)
+                       if isinstance(future, Future) and not future.done()]
+            if not waiting:
+                return 0
+
+            limit = RPC_POLL_INTERVAL
+            if deadline != None:
+                limit = min(limit, deadline - time.monotonic())
+                if limit <= 0:
+                    return len(waiting)
+            if self.request_deadlines:
+                limit = max(0, min(limit, self.request_deadlines[0][0] - time.monotonic()))
+            self.connection.process_data_events(time_limit=limit)
+
+    def gather_replies(self, futures, timeout=None):
+        '''
+              Waits for the futures given (see wait_replies), and returns their answers
+              in the same order, with an error string in place of each one that failed or isn't done.
+
+              Parameters
+              ----------
+              futures: list
+                    Futures returned by send_request.
+              timeout: float (optional)
+                    Seconds to wait at most (forever by default).
+        '''
+        futures = list(futures)
+        self.wait_replies(futures, timeout)
+        answers = []
+        for future in futures:
+            if isinstance(future, str):
+                # send_request returned an error
+                answers.append(future)
+            elif not future.done():
+                answers.append(f'ERROR: No answer for request {future.correlation_id} within {timeout} seconds')
+            elif future.cancelled() or future.exception() is not None:
+                answers.append(f'ERROR: Request {future.correlation_id} failed => {"cancelled" if future.cancelled() else future.exception()}')
+            else:
+                answers.append(future.result())
+        return answers
 
     def receive_n_send_one(self, queue_name: str, func):
         '''
@@ -354,24 +1028,23 @@ class Rabbit:
         '''
 
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
         def callback(ch, method, properties, body):
             try:
-                result = func(body.decode('utf-8'))
+                result = func(self.decode(body, properties))
             except:
                 print(
                     f"ERROR: Couldn't execute the function named {func.__name__} on the given message")
                 return f"ERROR: Couldn't execute the function named {func.__name__} on the given message"
 
+            body, encoding = self.encode(result, self.reply_codec(properties))
             ch.basic_publish(exchange='',
                              routing_key=properties.reply_to,
                              properties=pika.BasicProperties(
-                                 correlation_id=properties.correlation_id),
-                             body=str(result))
+                                 correlation_id=properties.correlation_id, **encoding),
+                             body=body)
             ch.basic_ack(delivery_tag=method.delivery_tag)
             ch.stop_consuming()
             return result
@@ -379,10 +1052,12 @@ class Rabbit:
             queue=queue_name, on_message_callback=callback)
         self.channel.start_consuming()
 
-    def receive_n_send_many(self, queue_name: str, func, reply_to_exchange: str=''):
+    def receive_n_send_many(self, queue_name: str, func, reply_to_exchange: str='', prefetch=None, workers=None):
         '''
               Receives a message, executes a function with it and returns an answer.
               Can consume endless messages.
+              With workers, the function runs in a pool of threads (see consume_in_pool),
+              so up to prefetch messages are handled at the same time.
               Check send_n_receive for more info.\n
               TO AVOID ERRORS, make sure the callback function 
               returns a correct string.\n
@@ -394,6 +1069,13 @@ class Rabbit:
                     Queue name to receive messages from.
               func: function
                     The function that will use the message.
+              reply_to_exchange: str (optional)
+                    Exchange name to send the answers to.
+              prefetch: int (optional)
+                    Amount of unacked messages to receive at once
+                    (the object's prefetch by default, at least workers when workers are used).
+              workers: int (optional)
+                    Amount of threads running the function.
 
               Raises
               ------
@@ -404,25 +1086,31 @@ class Rabbit:
         '''
 
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
+        def reply(ch, method, properties, result):
+            body, encoding = self.encode(result, self.reply_codec(properties))
+            ch.basic_publish(exchange=reply_to_exchange,
+                             routing_key=properties.reply_to,
+                             properties=pika.BasicProperties(
+                                 correlation_id=properties.correlation_id, **encoding),
+                             body=body)
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+
+        self.set_prefetch(prefetch, workers)
+        if workers != None and workers > 1:
+            return self.consume_in_pool(queue_name, func, workers, reply)
+
         def callback(ch, method, properties, body):
             try:
-                result = func(body.decode('utf-8'))
+                result = func(self.decode(body, properties))
             except:
                 print(
                     f"ERROR: Couldn't execute the function named {func.__name__} on the given message")
                 return f"ERROR: Couldn't execute the function named {func.__name__} on the given message"
 
-            ch.basic_publish(exchange=reply_to_exchange,
-                             routing_key=properties.reply_to,
-                             properties=pika.BasicProperties(
-                                 correlation_id=properties.correlation_id),
-                             body=str(result))
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            reply(ch, method, properties, result)
             return result
         self.channel.basic_consume(
             queue=queue_name, on_message_callback=callback)
@@ -449,14 +1137,12 @@ class Rabbit:
         '''
 
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
         def callback(ch, method, properties, body):
             try:
-                result = func(body.decode('utf-8'))
+                result = func(self.decode(body, properties))
                 ch.basic_ack(delivery_tag=method.delivery_tag)
             except:
                 print(
@@ -468,10 +1154,12 @@ class Rabbit:
             queue=queue_name, on_message_callback=callback)
         self.channel.start_consuming()
 
-    def consume_many(self, queue_name: str, func):
+    def consume_many(self, queue_name: str, func, prefetch=None, workers=None):
         '''
               Receives a message, executes a function with it.
               It can consume endlessly.
+              With workers, the function runs in a pool of threads (see consume_in_pool),
+              so up to prefetch messages are handled at the same time.
 
               Parameters
               ----------
@@ -479,6 +1167,11 @@ class Rabbit:
                     Queue name to send the message to.
               func: function
                     The function that will be use the message.
+              prefetch: int (optional)
+                    Amount of unacked messages to receive at once
+                    (the object's prefetch by default, at least workers when workers are used).
+              workers: int (optional)
+                    Amount of threads running the function.
 
               Raises
               ------
@@ -488,14 +1181,17 @@ class Rabbit:
               If it can't, an exception will be returned.
         '''
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
+        self.set_prefetch(prefetch, workers)
+        if workers != None and workers > 1:
+            return self.consume_in_pool(queue_name, func, workers,
+                                        lambda ch, method, properties, result: ch.basic_ack(delivery_tag=method.delivery_tag))
+
         def callback(ch, method, properties, body):
             try:
-                result = func(body.decode('utf-8'))
+                result = func(self.decode(body, properties))
                 ch.basic_ack(delivery_tag=method.delivery_tag)
             except:
                 print(
@@ -507,6 +1203,290 @@ class Rabbit:
             queue=queue_name, on_message_callback=callback)
         self.channel.start_consuming()
 
+    def consume_batches(self, queue_name: str, func, max_batch=500, max_wait_ms=1000, prefetch=None, requeue=True):
+        '''
+              Receives messages and executes a function with a list of them at a time.
+              It can consume endlessly.
+              Messages are gathered until max_batch of them arrived, or max_wait_ms passed
+              since the first of them arrived, and then the function is executed with
+              their decoded bodies (in the order they arrived).
+              Once it returns, the whole batch is acked with a single ack (multiple=True).
+              If it fails, the whole batch is nacked the same way (and requeued by default).
+              Each message is decoded as it arrives, one that can't be decoded is nacked on its own
+              without requeueing (so it's dropped, or dead-lettered if the queue is set so),
+              and isn't part of any batch.
+              Example of use:
+              rabbit.consume_batches('events', lambda bodies: db.insert_records('events', ('body',), [(body,) for body in bodies]))
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to receive messages from.
+              func: function
+                    The function that will use the list of messages.
+              max_batch: int (optional)
+                    Most messages handed to the function at once.
+              max_wait_ms: int (optional)
+                    Most milliseconds a message waits for its batch to fill.
+              prefetch: int (optional)
+                    Amount of unacked messages to receive at once (max_batch by default,
+                    since a batch can't grow past it).
+              requeue: bool (optional)
+                    Requeue the messages of a batch the function failed on (otherwise they're dropped,
+                    or dead-lettered if the queue is set so).
+
+              Raises
+              ------
+              Checks if the queue exists.
+              If it doesn't exist, an exception will be returned.
+              Tries to decode each message.
+              If it can't, an error will be printed and the message nacked.
+              Tries to execute the function.
+              If it can't, an error will be printed and the batch nacked.
+        '''
+
+        # first check if queue exists
+        if not self.check_queue(queue_name):
+            return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
+
+        self.set_prefetch(prefetch if prefetch != None else max(self.prefetch, max_batch))
+        # [delivery tags], [decoded bodies], and the timer flushing the batch
+        batch = {"tags": [], "bodies": [], "timer": None}
+
+        def flush():
+            if batch["timer"] != None:
+                self.connection.remove_timeout(batch["timer"])
+            tags, bodies = batch["tags"], batch["bodies"]
+            batch["tags"], batch["bodies"], batch["timer"] = [], [], None
+            if not tags:
+                return
+            try:
+                func(bodies)
+            except:
+                print(
+                    f"ERROR: Couldn't execute the function named {func.__name__} on a batch of {len(bodies)} messages")
+                self.channel.basic_nack(delivery_tag=tags[-1], multiple=True, requeue=requeue)
+                return
+            self.channel.basic_ack(delivery_tag=tags[-1], multiple=True)
+
+        def on_timer():
+            batch["timer"] = None
+            flush()
+
+        def callback(ch, method, properties, body):
+            try:
+                body = self.decode(body, properties)
+            except:
+                # requeueing it would only have it fail again
+                print(f"ERROR: Couldn't decode message {method.delivery_tag}, dropping it")
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
+            batch["tags"].append(method.delivery_tag)
+            batch["bodies"].append(body)
+            if len(batch["tags"]) >= max_batch:
+                flush()
+            elif batch["timer"] == None:
+                batch["timer"] = self.connection.call_later(max_wait_ms / 1000, on_timer)
+
+        self.channel.basic_consume(
+            queue=queue_name, on_message_callback=callback)
+        self.channel.start_consuming()
+
+    def consume_large(self, queue_name: str, func, max_memory=LARGE_MEMORY_LIMIT, max_age=600):
+        '''
+              Receives messages sent by send_large, reassembles their chunks and executes
+              a function with each whole payload, as a file object (opened for binary reading,
+              at its start, and closed once the function returns).
+              It can consume endlessly.
+              Chunks are written to temporary files that stay in memory until the chunks of all
+              messages being reassembled pass max_memory bytes, then the largest are moved to disk.
+              Each chunk is acked once it's written, so a message's chunks don't pile up
+              on the broker (and are lost if the consumer stops before the message is whole).
+              Messages that weren't completed within max_age seconds of their last chunk are dropped.
+              Messages that weren't chunked are handed to the function as files as well.
+              Example of use:
+              rabbit.consume_large('dumps', lambda dump: shutil.copyfileobj(dump, open('dump.bin', 'wb')))
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to receive messages from.
+              func: function
+                    The function that will use the payload file.
+              max_memory: int (optional)
+                    Bytes of chunks kept in memory before moving them to disk.
+              max_age: float (optional)
+                    Seconds an incomplete message is kept since its last chunk arrived.
+
+              Raises
+              ------
+              Checks if the queue exists.
+              If it doesn't exist, an exception will be returned.
+              Tries to execute the function.
+              If it can't, an error will be printed.
+        '''
+
+        # first check if queue exists
+        if not self.check_queue(queue_name):
+            return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
+
+        # chunk id => {"file", "received" (indexes), "last" (index), "size", "rolled", "updated"}
+        messages = {}
+        # the timer dropping expired messages
+        timer = {"id": None}
+
+        def handle(payload):
+            try:
+                payload.seek(0)
+                func(payload)
+            except:
+                print(
+                    f"ERROR: Couldn't execute the function named {func.__name__} on the given message")
+            finally:
+                payload.close()
+
+        def drop_expired():
+            now = time.monotonic()
+            for chunk_id in [chunk_id for chunk_id, message in messages.items() if now - message["updated"] > max_age]:
+                message = messages.pop(chunk_id)
+                print(f"ERROR: Message {chunk_id} wasn't completed within {max_age} seconds "
+                      f"({len(message['received'])} chunks arrived), dropping it")
+                message["file"].close()
+
+        def on_timer():
+            drop_expired()
+            timer["id"] = self.connection.call_later(min(max_age, 60), on_timer)
+
+        def bound_memory():
+            in_memory = [message for message in messages.values() if not message["rolled"]]
+            used = sum(message["size"] for message in in_memory)
+            for message in sorted(in_memory, key=lambda message: message["size"], reverse=True):
+                if used <= max_memory:
+                    break
+                message["file"].rollover()
+                message["rolled"] = True
+                used -= message["size"]
+
+        def callback(ch, method, properties, body):
+            headers = properties.headers or {}
+            if "x-chunk-id" not in headers:
+                try:
+                    payload = io.BytesIO(self.decompress(body, properties))
+                except:
+                    print(f"ERROR: Couldn't decompress message {method.delivery_tag}, dropping it")
+                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                    return
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+                handle(payload)
+                return
+
+            chunk_id, index = headers["x-chunk-id"], headers["x-chunk-index"]
+            message = messages.get(chunk_id)
+            if message == None:
+                message = {"file": tempfile.SpooledTemporaryFile(max_size=max_memory), "received": set(),
+                           "last": None, "size": 0, "rolled": False}
+                messages[chunk_id] = message
+            message["updated"] = time.monotonic()
+            if headers.get("x-chunk-last"):
+                message["last"] = index
+
+            if index not in message["received"]:
+                try:
+                    data = self.decompress(body, properties)
+                except:
+                    print(f"ERROR: Couldn't decompress chunk {index} of message {chunk_id}, dropping the message")
+                    del messages[chunk_id]
+                    message["file"].close()
+                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                    return
+                # chunks might arrive out of order (ie when requeued), so each is written at its place
+                offset = headers.get("x-chunk-offset", index * headers["x-chunk-size"])
+                message["file"].seek(offset)
+                message["file"].write(data)
+                message["received"].add(index)
+                message["size"] = max(message["size"], offset + len(data))
+                if message["size"] > max_memory:
+                    # the file moved itself to disk
+                    message["rolled"] = True
+                bound_memory()
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+
+            if message["last"] != None and len(message["received"]) == message["last"] + 1:
+                del messages[chunk_id]
+                handle(message["file"])
+
+        timer["id"] = self.connection.call_later(min(max_age, 60), on_timer)
+        self.channel.basic_consume(
+            queue=queue_name, on_message_callback=callback)
+        try:
+            self.channel.start_consuming()
+        finally:
+            try:
+                self.connection.remove_timeout(timer["id"])
+            except:
+                pass
+            for message in messages.values():
+                message["file"].close()
+
+    def set_prefetch(self, prefetch=None, workers=None):
+        '''
+              Sets the amount of unacked messages consumers started from now on are sent at once.
+              Defaults to the object's prefetch, raised to the amount of workers
+              so none of them is left idle.
+        '''
+        if prefetch == None:
+            prefetch = self.prefetch
+            if workers != None:
+                prefetch = max(prefetch, workers)
+        self.channel.basic_qos(prefetch_count=prefetch)
+
+    def consume_in_pool(self, queue_name: str, func, workers: int, on_result):
+        '''
+              Consumes endlessly, running the function on each message in a pool of threads,
+              so a slow function doesn't stall the connection (and its heartbeats),
+              and up to prefetch messages are handled at the same time.
+              Since the connection isn't thread-safe, once the function returns,
+              on_result(ch, method, properties, result) (which acks, replies and so on)
+              is handed back to the connection's thread with add_callback_threadsafe.
+              A message the function failed on isn't acked (as in consume_many).
+
+              Parameters
+              ----------
+              queue_name: str
+                    Queue name to receive messages from.
+              func: function
+                    The function that will use the message.
+              workers: int
+                    Amount of threads running the function.
+              on_result: function
+                    Called in the connection's thread with the function's result.
+        '''
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+        def callback(ch, method, properties, body):
+            def done(future):
+                try:
+                    result = future.result()
+                except:
+                    print(
+                        f"ERROR: Couldn't execute the function named {func.__name__} on the given message")
+                    return
+                try:
+                    self.connection.add_callback_threadsafe(partial(on_result, ch, method, properties, result))
+                except:
+                    # the connection was closed meanwhile, the message will be redelivered
+                    pass
+
+            # decoding (and decompressing) runs in the pool as well
+            executor.submit(lambda: func(self.decode(body, properties))).add_done_callback(done)
+
+        self.channel.basic_consume(
+            queue=queue_name, on_message_callback=callback)
+        try:
+            self.channel.start_consuming()
+        finally:
+            executor.shutdown(wait=False)
+
     def receive_n_redirect_many(self, queue_name: str, func, reply_to_exchange: str=''):
         '''
               Receives a message, executes a function with it and returns an answer.
@@ -537,32 +1517,34 @@ class Rabbit:
         '''
 
         # first check if queue exists
-        try:
-            self.declare_queue(queue_name, True)
-        except:
+        if not self.check_queue(queue_name):
             return(f'ERROR: Queue named {queue_name} not found. \n       Consider declaring it first.')
 
         def callback(ch, method, properties, body):
             try:
-                result = func(body.decode('utf-8'))
+                result = func(self.decode(body, properties))
             except:
                 print(
                     f"ERROR: Couldn't execute the function named {func.__name__} on the given message")
                 return f"ERROR: Couldn't execute the function named {func.__name__} on the given message"
 
             if type(result) == type({}) and 'redirect_to' in result and 'exchange' in result:
+                # the message is passed on as it was received, still encoded
                 ch.basic_publish(exchange=result['exchange'],
                                  routing_key=result['redirect_to'],
                                  properties=pika.BasicProperties(
                                      correlation_id=properties.correlation_id,
-                                     reply_to=properties.reply_to),
-                                 body=body.decode('utf-8'))
+                                     reply_to=properties.reply_to,
+                                     content_type=properties.content_type,
+                                     content_encoding=properties.content_encoding),
+                                 body=body)
             else:
+                reply_body, encoding = self.encode(result, self.reply_codec(properties))
                 ch.basic_publish(exchange=reply_to_exchange,
                                  routing_key=properties.reply_to,
                                  properties=pika.BasicProperties(
-                                     correlation_id=properties.correlation_id),
-                                 body=str(result))
+                                     correlation_id=properties.correlation_id, **encoding),
+                                 body=reply_body)
             ch.basic_ack(delivery_tag=method.delivery_tag)
             return result
         self.channel.basic_consume(